@@ -0,0 +1,222 @@
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+RATE_LIMITED = "rate_limited"
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class Rejected(Exception):
+    """A request shed before it is handled, with the status and Retry-After to answer with"""
+
+    def __init__(self, message, status_code, reason, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimiter:
+    """Token bucket per client.
+
+    Each client may burst `burst` requests and is then refilled at `rate`
+    per second; past that its requests are rejected with a 429. Buckets
+    of the least recently seen clients are dropped beyond `max_clients`,
+    so memory stays bounded however many keys callers make up. A rate of
+    0 disables the limit.
+    """
+
+    def __init__(self, rate, burst=None, max_clients=10000):
+        self.rate = rate
+        self.burst = max(1.0, float(burst if burst is not None else rate))
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        # key -> (tokens, monotonic time they were counted at)
+        self._buckets = OrderedDict()
+        self._limited = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def check(self, key):
+        """Take a token for `key`, or raise Rejected (429)"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, counted_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - counted_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = None
+            else:
+                self._limited += 1
+                retry_after = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if retry_after is not None:
+            raise Rejected("Rate limit exceeded, slow down", 429, RATE_LIMITED, retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "limited": self._limited,
+            }
+
+
+class AdmissionQueue:
+    """Bounds the requests a worker handles at once.
+
+    Up to `max_active` requests run; up to `max_waiting` more wait, at
+    most `timeout` seconds, for one of them to finish. Anything beyond is
+    rejected with a 503 straight away, so a spike is answered by a few
+    fast rejections instead of every request slowing down until the
+    upstream timeouts fire. A `max_active` of 0 disables the bound.
+
+    Threaded servers bracket a request with `acquire()` / `release()` or
+    use `admit()`.
+    """
+
+    def __init__(self, max_active, max_waiting=0, timeout=5.0):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._queued = 0
+        self._shed = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+
+    @property
+    def enabled(self):
+        return self.max_active > 0
+
+    def acquire(self):
+        if not self.enabled:
+            return
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            if self._active >= self.max_active:
+                self._check_room()
+                self._waiting += 1
+                try:
+                    while self._active >= self.max_active:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._timed_out()
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._admitted += 1
+
+    def release(self):
+        if not self.enabled:
+            return
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _check_room(self):
+        if self._waiting >= self.max_waiting:
+            self._shed[QUEUE_FULL] += 1
+            raise Rejected("Server is at capacity, retry shortly", 503, QUEUE_FULL, 1.0)
+        self._queued += 1
+
+    def _timed_out(self):
+        self._shed[QUEUE_TIMEOUT] += 1
+        return Rejected("Server is busy, retry shortly", 503, QUEUE_TIMEOUT, self.timeout)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_active": self.max_active,
+                "max_waiting": self.max_waiting,
+                "timeout_seconds": self.timeout,
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "shed": dict(self._shed),
+            }
+
+
+class AsyncAdmissionQueue(AdmissionQueue):
+    """AdmissionQueue for handlers on one asyncio event loop.
+
+    Waiting requests are futures rather than blocked threads, and a
+    finishing request hands its slot to the longest waiting one.
+    """
+
+    def __init__(self, max_active, max_waiting=0, timeout=5.0):
+        super().__init__(max_active, max_waiting, timeout)
+        self._waiters = deque()
+
+    async def acquire(self):
+        if not self.enabled:
+            return
+        if self._active < self.max_active:
+            self._active += 1
+            self._admitted += 1
+            return
+
+        self._check_room()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done() or waiter.cancelled():
+                raise self._timed_out() from None
+        except BaseException:
+            # Cancelled after the slot was handed over: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self._waiting -= 1
+            if not waiter.done():
+                waiter.cancel()
+        self._admitted += 1
+
+    def release(self):
+        if not self.enabled:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter; _active stays the same
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,118 @@
+import queue
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from process_local import ProcessThreads
+
+logger = logging.getLogger("waste_classification_batching")
+
+# Queued by close(); the worker stops once it reaches it
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests into batched model calls.
+
+    Items submitted from request threads are gathered until either
+    `max_batch_size` items are waiting or `max_wait_ms` has passed since the
+    first one arrived, then `predict_batch` is called once for the whole
+    batch and each caller's future receives its own result.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=10):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = ProcessThreads(self._start_worker, self._lock)
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+
+    def submit(self, item):
+        """Queue an item and return a Future for its result"""
+        if self._closed:
+            raise RuntimeError("Batcher is closed")
+        self._worker.ensure()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Stop the worker after the items already queued have been processed"""
+        with self._lock:
+            self._closed = True
+            if self._worker.running:
+                self._queue.put((_STOP, None))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batch_size_histogram": {
+                    str(size): count for size, count in sorted(self._batch_sizes.items())
+                },
+            }
+
+    def _start_worker(self):
+        # Items queued in the parent process have no worker here
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+
+    def _run(self, pending):
+        stopping = False
+        while not stopping:
+            first = pending.get()
+            if first[0] is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry[0] is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            try:
+                self._process(batch)
+            except Exception:
+                # Keep the worker alive; a dead worker would hang every later request
+                logger.exception("Micro-batch failed")
+
+    def _process(self, batch):
+        # Callers that timed out have cancelled their futures; skip their
+        # items, and mark the rest running so they can no longer be cancelled
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        try:
+            results = self.predict_batch(items)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
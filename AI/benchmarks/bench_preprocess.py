@@ -0,0 +1,90 @@
+"""Benchmark the upload decode/resize stage ahead of the model.
+
+Compares the original path (full-resolution decode, then the image
+processor) with the draft-mode fast path in image_preprocessing.py, and
+reports per-image latency and the bytes forwarded upstream.
+
+    python benchmarks/bench_preprocess.py [image ...] [--repeat 20] [--model-path waste_classifier]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_preprocessing import encode_jpeg, load_image  # noqa: E402
+
+
+def synthetic_photo(width=4032, height=3024):
+    """12 MP JPEG with enough detail to resemble a phone photo"""
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    pixels = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize((width, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 2),
+        "p50_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*", help="Images to benchmark (default: synthetic 12 MP JPEG)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-side", type=int, default=384)
+    parser.add_argument("--model-path", default=None, help="Include the image processor step from this checkpoint")
+    args = parser.parse_args()
+
+    blobs = {path: open(path, "rb").read() for path in args.images} or {"synthetic-12mp.jpg": synthetic_photo()}
+
+    image_processor = None
+    if args.model_path:
+        from transformers import AutoImageProcessor
+        image_processor = AutoImageProcessor.from_pretrained(args.model_path, local_files_only=True)
+
+    def baseline(blob):
+        image = Image.open(io.BytesIO(blob)).convert("RGB")
+        if image_processor is not None:
+            image_processor(images=image, return_tensors="pt")
+
+    def fast(blob):
+        image = load_image(blob, max_side=args.max_side)
+        if image_processor is not None:
+            image_processor(images=image, return_tensors="pt")
+
+    report = []
+    for name, blob in blobs.items():
+        baseline_stats = time_call(lambda: baseline(blob), args.repeat)
+        fast_stats = time_call(lambda: fast(blob), args.repeat)
+        report.append({
+            "image": name,
+            "upload_bytes": len(blob),
+            "forwarded_bytes": len(encode_jpeg(load_image(blob, max_side=args.max_side))),
+            "baseline": baseline_stats,
+            "fast_path": fast_stats,
+            "speedup": round(baseline_stats["mean_ms"] / fast_stats["mean_ms"], 2),
+        })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
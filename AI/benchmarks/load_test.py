@@ -0,0 +1,285 @@
+"""Load-test the waste classification API against local stub upstreams.
+
+Starts stub Hugging Face and backend servers with configurable latency
+and error injection, launches the API in a subprocess pointed at them,
+drives /predict at each concurrency level and prints throughput, latency
+percentiles and error rates as JSON.
+
+    python benchmarks/load_test.py --concurrency 1 8 32 --requests 500
+    python benchmarks/load_test.py --server async --hf-latency-ms 200 --hf-error-rate 0.05
+    python benchmarks/load_test.py --server-cmd "gunicorn -w 4 -b 127.0.0.1:{port} waste_classification_api:app"
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shlex
+import socket
+import argparse
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_COMMANDS = {
+    "flask": [sys.executable, "waste_classification_api.py"],
+    "async": [sys.executable, "waste_classification_async.py"],
+}
+
+
+# --- Stub upstreams ---
+
+class StubUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_ms, jitter_ms, error_rate, body):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.body = json.dumps(body).encode()
+        self.requests = 0
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server.requests += 1
+        delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+        time.sleep(delay / 1000.0)
+
+        if random.random() < server.error_rate:
+            status, body = 503, b'{"error": "injected failure"}'
+        else:
+            status, body = 200, server.body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency_ms, jitter_ms, error_rate, body):
+    stub = StubUpstream(latency_ms, jitter_ms, error_rate, body)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+
+# --- App under test ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(args, hf_url, backend_url):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "HF_API_URL": hf_url,
+        "HF_API_TOKEN": env.get("HF_API_TOKEN", "load-test"),
+        "BACKEND_URL": backend_url,
+        "INFERENCE_MODE": args.inference_mode,
+        # Cache hits would hide upstream latency; enable explicitly to measure them
+        "PREDICTION_CACHE_SIZE": str(args.cache_size),
+    })
+    if args.model_path:
+        env["MODEL_PATH"] = args.model_path
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    if args.server_cmd:
+        command = shlex.split(args.server_cmd.format(port=port))
+    else:
+        command = SERVER_COMMANDS[args.server]
+
+    process = subprocess.Popen(
+        command, cwd=AI_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + args.startup_timeout
+    started = time.monotonic()
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url, time.monotonic() - started
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy in time")
+
+
+# --- Load generation ---
+
+def synthetic_image():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (90, 160, 60)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_level(base_url, image_bytes, concurrency, total_requests, unique_images):
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        # Vary the bytes so the prediction cache does not serve repeats
+        payload = image_bytes + (i.to_bytes(8, "little") if unique_images else b"")
+        start = time.perf_counter()
+        try:
+            response = session.post(
+                f"{base_url}/predict",
+                files={"image": ("load.jpg", payload, "image/jpeg")},
+                headers={"Authorization": "Bearer load-test"},
+                timeout=60,
+            )
+            status = response.status_code
+            if status == 200 and not response.json().get("success"):
+                status = "unsuccessful"
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "duration_seconds": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(1000 * percentile(latencies, 0.50), 2),
+            "p95": round(1000 * percentile(latencies, 0.95), 2),
+            "p99": round(1000 * percentile(latencies, 0.99), 2),
+            "max": round(1000 * latencies[-1], 2) if latencies else 0.0,
+        },
+        "error_rate": round(errors / total_requests, 4) if total_requests else 0.0,
+        "status_counts": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against stub upstreams")
+    parser.add_argument("--server", choices=sorted(SERVER_COMMANDS), default="flask")
+    parser.add_argument("--server-cmd", help="Custom launch command; {port} is substituted")
+    parser.add_argument("--url", help="Test an already running server instead of launching one")
+    parser.add_argument("--inference-mode", choices=["remote", "local"], default="remote")
+    parser.add_argument("--model-path", help="Checkpoint for --inference-mode local")
+    parser.add_argument("--cache-size", type=int, default=0, help="PREDICTION_CACHE_SIZE for the server")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server (repeatable)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--repeat-images", action="store_true", help="Send identical bytes every time")
+    parser.add_argument("--image", help="Image to upload (default: synthetic 640x480 JPEG)")
+    parser.add_argument("--hf-latency-ms", type=float, default=50)
+    parser.add_argument("--hf-jitter-ms", type=float, default=20)
+    parser.add_argument("--hf-error-rate", type=float, default=0.0)
+    parser.add_argument("--backend-latency-ms", type=float, default=30)
+    parser.add_argument("--backend-jitter-ms", type=float, default=10)
+    parser.add_argument("--backend-error-rate", type=float, default=0.0)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    args = parser.parse_args()
+
+    hf_stub = start_stub(
+        args.hf_latency_ms, args.hf_jitter_ms, args.hf_error_rate,
+        [{"label": "biodegradable", "score": 0.91}, {"label": "non_biodegradable", "score": 0.09}]
+    )
+    backend_stub = start_stub(
+        args.backend_latency_ms, args.backend_jitter_ms, args.backend_error_rate,
+        {"status": "ok"}
+    )
+
+    process = None
+    startup_seconds = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        process, base_url, startup_seconds = start_app(args, f"{hf_stub.url}/models/stub", f"{backend_stub.url}/wasteSubmission")
+
+    image_bytes = open(args.image, "rb").read() if args.image else synthetic_image()
+    try:
+        run_level(base_url, image_bytes, 1, args.warmup, not args.repeat_images)
+        levels = [
+            run_level(base_url, image_bytes, concurrency, args.requests, not args.repeat_images)
+            for concurrency in args.concurrency
+        ]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "config": {
+            "server": args.url or args.server_cmd or args.server,
+            "inference_mode": args.inference_mode,
+            "hf_stub": {"latency_ms": args.hf_latency_ms, "jitter_ms": args.hf_jitter_ms,
+                        "error_rate": args.hf_error_rate},
+            "backend_stub": {"latency_ms": args.backend_latency_ms, "jitter_ms": args.backend_jitter_ms,
+                             "error_rate": args.backend_error_rate},
+            "env": args.env,
+        },
+        "startup_seconds": round(startup_seconds, 2) if startup_seconds is not None else None,
+        "upstream_requests": {"huggingface": hf_stub.requests, "backend": backend_stub.requests},
+        "levels": levels,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
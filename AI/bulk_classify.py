@@ -0,0 +1,244 @@
+import os
+import csv
+import glob
+import json
+import time
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger("waste_classifier_bulk")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+
+
+# --- Sources ---
+
+def iter_image_paths(source):
+    """Iterate over image paths from a directory tree, a glob pattern or a CSV manifest.
+
+    Directories and globs are sorted so that the order, and therefore the
+    resume checkpoint, is stable between runs. Manifests keep their own
+    order and use the "path" column, or the first column when the first
+    row is already an image path rather than a header. Relative manifest
+    paths are resolved against the manifest's directory. A manifest with a
+    header but no "path" column raises ValueError here, before any output
+    is written.
+    """
+    if os.path.isdir(source):
+        return _walk_directory(source)
+    if source.lower().endswith(".csv"):
+        with open(source, newline="") as f:
+            first_row = next(csv.reader(f), None)
+        if first_row and "path" not in first_row and not first_row[0].lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError(
+                f"Manifest {source} has no 'path' column (header: {', '.join(first_row)})"
+            )
+        return _read_manifest(source)
+    return (path for path in sorted(glob.iglob(source, recursive=True)) if os.path.isfile(path))
+
+
+def _walk_directory(source):
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def _read_manifest(source):
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return
+        if "path" in header:
+            column = header.index("path")
+        else:
+            # No header: the first row is an image
+            column = 0
+            rows = itertools.chain([header], rows)
+        for row in rows:
+            if row:
+                path = row[column]
+                yield path if os.path.isabs(path) else os.path.join(base, path)
+
+
+def decode_for_model(path, size):
+    """Decode and resize one image in a worker process.
+
+    Returns (path, uint8 HxWx3 array or None, error or None). JPEGs use
+    draft mode so large photos are decoded at reduced resolution.
+    """
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", size)
+            image = image.convert("RGB").resize(size, Image.BILINEAR)
+            return path, np.asarray(image, dtype=np.uint8), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+# --- Writers ---
+
+class JsonlWriter:
+    def __init__(self, path, resume_state=None):
+        self.path = path
+        mode = "r+b" if resume_state and os.path.exists(path) else "wb"
+        self.file = open(path, mode)
+        if resume_state:
+            # Drop anything written after the last checkpoint
+            self.file.truncate(resume_state.get("output_bytes", 0))
+            self.file.seek(0, os.SEEK_END)
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps(record).encode() + b"\n")
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"output_bytes": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes one Parquet part file per flush into an output directory"""
+
+    def __init__(self, path, resume_state=None):
+        self.path = path
+        self.parts = resume_state.get("parts", 0) if resume_state else 0
+        self.buffer = []
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, records):
+        self.buffer.extend(records)
+
+    def flush(self):
+        if self.buffer:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            for record in self.buffer:
+                record.setdefault("error", None)
+            table = pa.Table.from_pylist(self.buffer)
+            pq.write_table(table, os.path.join(self.path, f"part-{self.parts:05d}.parquet"))
+            self.parts += 1
+            self.buffer = []
+        return {"parts": self.parts}
+
+    def close(self):
+        self.flush()
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+# --- Pipeline ---
+
+def run_bulk(source, output, model, image_processor, batch_size=32, workers=None,
+             output_format="jsonl", resume=False, flush_every=10, temperature=1.0):
+    """Classify every image in `source`, appending results to `output`.
+
+    Decoding runs in a process pool with a bounded window of in-flight
+    images; the model consumes them in batches in the main process. A
+    checkpoint next to the output records how many images have been
+    written, so `resume=True` continues an interrupted run. Confidences
+    are calibrated with `temperature` (see calibrate.py).
+    """
+    import torch
+    from calibrate import softmax
+
+    checkpoint_path = f"{output}.checkpoint.json"
+    state = None
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if state.get("source") != source:
+            raise ValueError(f"Checkpoint {checkpoint_path} belongs to source {state.get('source')}")
+        logger.info(f"Resuming after {state['completed']} images")
+
+    completed = state["completed"] if state else 0
+    paths = iter_image_paths(source)
+    writer = WRITERS[output_format](output, state)
+    id2label = {int(k): v for k, v in model.config.id2label.items()}
+    size = image_processor.size
+    size = (size["width"], size["height"]) if "width" in size else (size["shortest_edge"],) * 2
+
+    def save_checkpoint():
+        checkpoint = {"source": source, "completed": completed, **writer.flush()}
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def classify(batch):
+        records = [{"path": path, "error": error} for path, _, error in batch if error]
+        decoded = [(path, array) for path, array, error in batch if error is None]
+        if decoded:
+            inputs = image_processor(images=[array for _, array in decoded], return_tensors="pt")
+            with torch.no_grad():
+                logits = model(pixel_values=inputs["pixel_values"]).logits.float().numpy()
+            probs = softmax(logits, temperature)
+            label_ids, confidences = probs.argmax(axis=1), probs.max(axis=1)
+            for (path, _), label_id, confidence in zip(decoded, label_ids.tolist(), confidences.tolist()):
+                records.append({"path": path, "label": id2label[label_id], "confidence": round(confidence, 4)})
+        return records
+
+    for _ in range(completed):
+        if next(paths, None) is None:
+            break
+
+    workers = workers or os.cpu_count()
+    window = max(batch_size * 4, workers * 2)
+    batch = []
+    batches_since_flush = 0
+    processed = 0
+    start = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            exhausted = False
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < window:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                    else:
+                        in_flight.append(pool.submit(decode_for_model, path, size))
+
+                if in_flight:
+                    batch.append(in_flight.popleft().result())
+
+                if len(batch) >= batch_size or (exhausted and not in_flight and batch):
+                    writer.write(classify(batch))
+                    completed += len(batch)
+                    processed += len(batch)
+                    batch = []
+                    batches_since_flush += 1
+                    if batches_since_flush >= flush_every:
+                        save_checkpoint()
+                        batches_since_flush = 0
+                        elapsed = time.perf_counter() - start
+                        logger.info(f"{completed} images done ({processed / elapsed:.1f} images/s)")
+        save_checkpoint()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Bulk classification finished: {processed} images in {elapsed:.1f}s "
+        f"({processed / elapsed if elapsed > 0 else 0:.1f} images/s), {completed} total in {output}"
+    )
+    return completed
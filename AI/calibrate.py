@@ -0,0 +1,188 @@
+"""Temperature calibration of the classifier's probabilities.
+
+A fine-tuned classifier's softmax scores are usually overconfident.
+Dividing the logits by one temperature T, fitted to minimise the negative
+log-likelihood on the validation split, keeps the predicted label and
+makes the scores track the actual accuracy. T is saved as calibration.json
+next to the checkpoint; LocalClassifier and test.py apply it whenever it
+is present.
+
+    python calibrate.py --model-path waste_classifier
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+
+# --- Logging setup ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classifier_calibrate")
+
+# --- Config ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, "waste_classifier")
+CALIBRATION_FILE = "calibration.json"
+ECE_BINS = 15
+
+
+# --- Vectorized probabilities ---
+def softmax(logits, temperature=1.0):
+    """Row-wise softmax of an (N, C) logit array at `temperature`"""
+    scaled = np.asarray(logits, dtype=np.float64) / temperature
+    scaled -= scaled.max(axis=1, keepdims=True)
+    exp = np.exp(scaled)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def top_k(probs, k):
+    """(label ids, probabilities) of the k most likely classes per row, best first"""
+    k = min(k, probs.shape[1])
+    order = np.argsort(-probs, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(probs, order, axis=1)
+
+
+def negative_log_likelihood(logits, labels, temperature=1.0):
+    scaled = np.asarray(logits, dtype=np.float64) / temperature
+    peak = scaled.max(axis=1, keepdims=True)
+    log_norm = peak[:, 0] + np.log(np.exp(scaled - peak).sum(axis=1))
+    return float((log_norm - scaled[np.arange(len(labels)), labels]).mean())
+
+
+def expected_calibration_error(probs, labels, bins=ECE_BINS):
+    """Gap between confidence and accuracy, averaged over confidence bins"""
+    confidences = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == labels
+    bin_ids = np.minimum((confidences * bins).astype(int), bins - 1)
+    counts = np.bincount(bin_ids, minlength=bins)
+    confidence_sums = np.bincount(bin_ids, weights=confidences, minlength=bins)
+    correct_sums = np.bincount(bin_ids, weights=correct, minlength=bins)
+    return float(np.abs(confidence_sums - correct_sums).sum() / max(len(labels), 1))
+
+
+# --- Fitting ---
+def fit_temperature(logits, labels, low=0.05, high=20.0, iterations=80):
+    """Temperature minimising the NLL of `labels`.
+
+    The NLL is convex in 1/T, so a golden-section search over 1/T finds
+    the minimum without an optimiser dependency.
+    """
+    logits = np.asarray(logits, dtype=np.float64)
+    labels = np.asarray(labels)
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = 1.0 / high, 1.0 / low
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    f_c = negative_log_likelihood(logits, labels, 1.0 / c)
+    f_d = negative_log_likelihood(logits, labels, 1.0 / d)
+    for _ in range(iterations):
+        if f_c < f_d:
+            b, d, f_d = d, c, f_c
+            c = b - ratio * (b - a)
+            f_c = negative_log_likelihood(logits, labels, 1.0 / c)
+        else:
+            a, c, f_c = c, d, f_d
+            d = a + ratio * (b - a)
+            f_d = negative_log_likelihood(logits, labels, 1.0 / d)
+    return 2.0 / (a + b)
+
+
+def fit_and_save(model_path, logits, labels, split="val"):
+    """Fit T on `split` logits, write calibration.json into `model_path` and return its contents"""
+    logits = np.asarray(logits, dtype=np.float64)
+    labels = np.asarray(labels)
+    temperature = fit_temperature(logits, labels)
+    before, after = softmax(logits), softmax(logits, temperature)
+    calibration = {
+        "temperature": round(temperature, 6),
+        "fitted_on": split,
+        "samples": int(len(labels)),
+        "nll": {
+            "before": round(negative_log_likelihood(logits, labels), 6),
+            "after": round(negative_log_likelihood(logits, labels, temperature), 6),
+        },
+        "ece": {
+            "before": round(expected_calibration_error(before, labels), 6),
+            "after": round(expected_calibration_error(after, labels), 6),
+        },
+    }
+
+    path = os.path.join(model_path, CALIBRATION_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(tmp_path, path)
+    logger.info(
+        f"Calibration temperature {calibration['temperature']} on {len(labels)} {split} images "
+        f"(NLL {calibration['nll']['before']} -> {calibration['nll']['after']}, "
+        f"ECE {calibration['ece']['before']} -> {calibration['ece']['after']}), saved to {path}"
+    )
+    return calibration
+
+
+def load_temperature(model_path):
+    """The fitted temperature for a checkpoint, or 1.0 (uncalibrated) without calibration.json"""
+    path = os.path.join(model_path, CALIBRATION_FILE)
+    try:
+        with open(path) as f:
+            temperature = float(json.load(f)["temperature"])
+    except FileNotFoundError:
+        return 1.0
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable {path}: {e}")
+        return 1.0
+    if not temperature > 0:
+        logger.warning(f"Ignoring non-positive temperature in {path}")
+        return 1.0
+    return temperature
+
+
+def split_logits(model, dataset, batch_size=32):
+    """(logits, labels) arrays for every item of a train.py split"""
+    import torch
+    from torch.utils.data import DataLoader
+    from train import collate_fn
+
+    all_logits, all_labels = [], []
+    with torch.no_grad():
+        for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn):
+            all_logits.append(model(pixel_values=batch["pixel_values"]).logits.float().numpy())
+            all_labels.append(batch["labels"].numpy())
+    return np.concatenate(all_logits), np.concatenate(all_labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a softmax temperature on the validation split")
+    parser.add_argument("--model-path", default=MODEL_PATH, help="Checkpoint directory saved by train.py")
+    parser.add_argument("--shards", metavar="DIR", default=None,
+                        help="Read the validation split from tensor shards compiled by shards.py")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    from transformers import AutoImageProcessor
+    from local_inference import load_model
+    from train import prepare_datasets
+
+    model = load_model(args.model_path)
+    model.eval()
+    image_processor = AutoImageProcessor.from_pretrained(args.model_path, local_files_only=True)
+
+    try:
+        # Preprocess on the fly; only the validation split is read
+        dataset = prepare_datasets(
+            argparse.Namespace(shards=args.shards, lazy_preprocessing=True), image_processor
+        )
+    except Exception as e:
+        logger.error(f"Failed to load dataset: {e}")
+        return 1
+
+    start = time.perf_counter()
+    logits, labels = split_logits(model, dataset["val"], args.batch_size)
+    logger.info(f"Validation logits took {time.perf_counter() - start:.1f}s")
+    fit_and_save(args.model_path, logits, labels)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Distil the trained waste classifier into a small, fast student model.
+
+The fine-tuned ViT in waste_classifier/ is the teacher. A compact student
+(DeiT-tiny by default, or e.g. google/mobilenet_v2_1.0_224) is trained on
+the same seed-42 splits as train.py. Its loss is a blend of the KL
+divergence to the teacher's temperature-softened predictions and the usual
+cross-entropy on the labels. The student is saved like a train.py
+checkpoint, so test.py, export_onnx.py and the API load it directly. A
+latency-versus-accuracy comparison with the teacher is written next to it.
+
+    python distill.py --output-dir waste_classifier_student
+    python distill.py --student google/mobilenet_v2_1.0_224 --shards data_shards --profile fast
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+# torch and transformers are imported where they are used, as in train.py
+from train import (
+    SCRIPT_DIR, calibrate_saved_model, collate_fn, compute_metrics, prepare_datasets, resolve_profile,
+    save_model, throughput_callback, verify_saved_model
+)
+
+# --- Logging setup ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classifier_distill")
+
+# --- Config ---
+TEACHER_PATH = os.path.join(SCRIPT_DIR, "waste_classifier")
+STUDENT_SAVE_PATH = os.path.join(SCRIPT_DIR, "waste_classifier_student")
+STUDENT_MODEL = "facebook/deit-tiny-patch16-224"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distil the waste classifier into a smaller student")
+    parser.add_argument("--teacher", default=TEACHER_PATH, help="Teacher checkpoint saved by train.py")
+    parser.add_argument("--student", default=STUDENT_MODEL,
+                        help="Pretrained student to start from (Hugging Face model id or local directory)")
+    parser.add_argument("--output-dir", default=STUDENT_SAVE_PATH, help="Where to save the student")
+    parser.add_argument("--temperature", type=float, default=2.0, help="Softmax temperature for distillation")
+    parser.add_argument("--alpha", type=float, default=0.5,
+                        help="Weight of the distillation loss; 1 - alpha goes to the label loss")
+    parser.add_argument("--epochs", type=float, default=5)
+    parser.add_argument("--learning-rate", type=float, default=5e-5)
+    parser.add_argument("--lazy-preprocessing", action="store_true",
+                        help="Preprocess images on the fly in the DataLoader instead of caching pixel_values up front")
+    parser.add_argument("--dataloader-workers", type=int, default=None,
+                        help="DataLoader worker processes (decode/preprocess in parallel with training)")
+    parser.add_argument("--profile", choices=["default", "fast"], default="default",
+                        help="Training performance profile, as in train.py")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--shards", metavar="DIR", default=None,
+                        help="Train from tensor shards compiled by shards.py instead of decoding the image folder")
+    parser.add_argument("--latency-runs", type=int, default=50,
+                        help="Single-image forward passes timed per model for the report")
+    return parser.parse_args()
+
+
+# --- Teacher targets ---
+def same_preprocessing(a, b):
+    """Whether two image processors produce identical pixel_values"""
+    keys = ("image_mean", "image_std", "size", "crop_size", "do_center_crop", "rescale_factor")
+    return all(getattr(a, key, None) == getattr(b, key, None) for key in keys)
+
+
+def teacher_logits(teacher, dataset, batch_size):
+    """Teacher logits for every item of `dataset`, in order.
+
+    Computed once up front rather than in every training step, since the
+    teacher is frozen and the training images are not augmented.
+    """
+    import torch
+    from torch.utils.data import DataLoader
+
+    logger.info(f"Computing teacher logits for {len(dataset)} training images")
+    start = time.perf_counter()
+    outputs = []
+    with torch.no_grad():
+        for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn):
+            outputs.append(teacher(pixel_values=batch["pixel_values"]).logits.float())
+    logger.info(f"Teacher logits took {time.perf_counter() - start:.1f}s")
+    return torch.cat(outputs)
+
+
+class WithTeacherLogits:
+    """Training items with the teacher's logits for the same image attached"""
+
+    def __init__(self, dataset, logits):
+        self.dataset = dataset
+        self.logits = logits
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        item = dict(self.dataset[index])
+        item["teacher_logits"] = self.logits[index]
+        return item
+
+
+def distill_collate_fn(batch):
+    import torch
+
+    inputs = collate_fn(batch)
+    if "teacher_logits" in batch[0]:
+        inputs["teacher_logits"] = torch.stack([item["teacher_logits"] for item in batch])
+    return inputs
+
+
+def distillation_trainer(temperature, alpha):
+    """Trainer class whose loss blends distillation and label cross-entropy"""
+    import torch.nn.functional as F
+    from transformers import Trainer
+
+    class DistillationTrainer(Trainer):
+        def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+            # Evaluation batches carry no teacher logits and use the label loss alone
+            targets = inputs.pop("teacher_logits", None)
+            outputs = model(**inputs)
+            loss = outputs.loss
+            if targets is not None:
+                distillation_loss = F.kl_div(
+                    F.log_softmax(outputs.logits / temperature, dim=-1),
+                    F.softmax(targets.to(outputs.logits.dtype) / temperature, dim=-1),
+                    reduction="batchmean",
+                ) * temperature ** 2
+                loss = alpha * distillation_loss + (1 - alpha) * loss
+            return (loss, outputs) if return_outputs else loss
+
+    return DistillationTrainer
+
+
+# --- Student ---
+def load_student(student, id2label):
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+    logger.info(f"Loading student {student}")
+    image_processor = AutoImageProcessor.from_pretrained(student)
+    model = AutoModelForImageClassification.from_pretrained(
+        student,
+        num_labels=len(id2label),
+        id2label=id2label,
+        label2id={label: label_id for label_id, label in id2label.items()},
+        ignore_mismatched_sizes=True
+    )
+    return model, image_processor
+
+
+# --- Latency vs accuracy report ---
+def benchmark(model, dataset, batch_size, latency_runs):
+    """Test-split accuracy, batched throughput and single-image latency"""
+    import numpy as np
+    import torch
+    from torch.utils.data import DataLoader
+
+    model.eval()
+    loader = DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn)
+    preds, labels = [], []
+    with torch.no_grad():
+        first = next(iter(loader))
+        # Keep one-off initialisation out of the timings
+        model(pixel_values=first["pixel_values"])
+
+        start = time.perf_counter()
+        for batch in loader:
+            preds.append(model(pixel_values=batch["pixel_values"]).logits.argmax(dim=1).numpy())
+            labels.append(batch["labels"].numpy())
+        elapsed = time.perf_counter() - start
+
+        single = first["pixel_values"][:1]
+        latencies = []
+        for _ in range(latency_runs):
+            run_start = time.perf_counter()
+            model(pixel_values=single)
+            latencies.append(time.perf_counter() - run_start)
+
+    preds, labels = np.concatenate(preds), np.concatenate(labels)
+    latencies = np.array(latencies) * 1000
+    return {
+        "parameters": sum(p.numel() for p in model.parameters()),
+        "accuracy": round(float((preds == labels).mean()), 4),
+        "images_per_second": round(len(labels) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+        },
+    }
+
+
+def compare(teacher_stats, student_stats):
+    return {
+        "speedup_p50": round(teacher_stats["latency_ms"]["p50"] / student_stats["latency_ms"]["p50"], 2),
+        "throughput_ratio": round(student_stats["images_per_second"] / teacher_stats["images_per_second"], 2),
+        "size_ratio": round(student_stats["parameters"] / teacher_stats["parameters"], 4),
+        "accuracy_delta": round(student_stats["accuracy"] - teacher_stats["accuracy"], 4),
+    }
+
+
+def main():
+    args = parse_args()
+    startup_start = time.perf_counter()
+
+    if not os.path.isdir(args.teacher):
+        logger.error(f"Teacher checkpoint not found: {args.teacher} (run train.py first)")
+        return 1
+
+    from transformers import AutoImageProcessor, TrainingArguments
+    from local_inference import load_model
+
+    logger.info(f"Loading teacher from {args.teacher}")
+    teacher = load_model(args.teacher)
+    teacher.eval()
+    teacher_processor = AutoImageProcessor.from_pretrained(args.teacher, local_files_only=True)
+    id2label = {int(k): v for k, v in teacher.config.id2label.items()}
+
+    model, image_processor = load_student(args.student, id2label)
+    profile = resolve_profile(args)
+    eval_batch_size = profile["per_device_eval_batch_size"]
+
+    try:
+        dataset = prepare_datasets(args, image_processor)
+        if same_preprocessing(teacher_processor, image_processor):
+            teacher_dataset = dataset
+        else:
+            logger.info("Teacher and student preprocess differently; preparing the splits for the teacher too")
+            teacher_dataset = prepare_datasets(args, teacher_processor)
+    except Exception as e:
+        logger.error(f"Failed to load dataset: {e}")
+        return 1
+
+    train_set = WithTeacherLogits(
+        dataset["train"], teacher_logits(teacher, teacher_dataset["train"], eval_batch_size)
+    )
+
+    # --- Distillation ---
+    training_args = TrainingArguments(
+        output_dir=os.path.join(SCRIPT_DIR, "distill_trainer_output"),
+        eval_strategy="epoch",
+        save_strategy="epoch",
+        num_train_epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        logging_dir=os.path.join(SCRIPT_DIR, "distill_logs"),
+        logging_steps=10,
+        load_best_model_at_end=True,
+        metric_for_best_model="accuracy",
+        save_total_limit=1,
+        report_to=[],
+        remove_unused_columns=False,  # Keep teacher_logits
+        **profile,
+    )
+    trainer = distillation_trainer(args.temperature, args.alpha)(
+        model=model,
+        args=training_args,
+        train_dataset=train_set,
+        eval_dataset=dataset["val"],
+        data_collator=distill_collate_fn,
+        compute_metrics=compute_metrics,
+        callbacks=[throughput_callback(
+            samples_per_step=training_args.train_batch_size * training_args.gradient_accumulation_steps,
+            report_path=os.path.join(training_args.output_dir, f"throughput_distill_{args.profile}.json"),
+            profile_name=args.profile,
+            profile=profile,
+        )],
+    )
+    logger.info(f"Startup (imports, data preparation, teacher pass) took {time.perf_counter() - startup_start:.1f}s")
+
+    logger.info(f"Distilling into {args.student} (temperature={args.temperature}, alpha={args.alpha})")
+    try:
+        trainer.train()
+    except Exception as e:
+        logger.error(f"Distillation failed: {e}")
+        return 1
+
+    try:
+        save_model(model, image_processor, args.output_dir)
+    except Exception as e:
+        logger.error(f"Failed to save model: {e}")
+        return 1
+    verify_saved_model(args.output_dir)
+    calibrate_saved_model(trainer, dataset["val"], args.output_dir)
+
+    # --- Report: teacher vs the saved student on the test split ---
+    logger.info("Benchmarking teacher and student on the test split...")
+    student = load_model(args.output_dir)
+    report = {
+        "teacher": {"path": os.path.abspath(args.teacher),
+                    **benchmark(teacher, teacher_dataset["test"], eval_batch_size, args.latency_runs)},
+        "student": {"path": os.path.abspath(args.output_dir), "base_model": args.student,
+                    **benchmark(student, dataset["test"], eval_batch_size, args.latency_runs)},
+        "settings": {"temperature": args.temperature, "alpha": args.alpha, "epochs": args.epochs,
+                     "learning_rate": args.learning_rate, "profile": args.profile},
+    }
+    report["comparison"] = compare(report["teacher"], report["student"])
+
+    report_path = os.path.join(args.output_dir, "distillation_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    for role in ("teacher", "student"):
+        stats = report[role]
+        logger.info(
+            f"{role}: {stats['parameters'] / 1e6:.1f}M params, accuracy={stats['accuracy']:.4f}, "
+            f"p50={stats['latency_ms']['p50']}ms, {stats['images_per_second']} images/s"
+        )
+    logger.info(f"Comparison: {report['comparison']} (report: {report_path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import inspect
+import logging
+import argparse
+import torch
+import numpy as np
+
+from local_inference import ONNX_FILES, load_model
+
+# --- Logging setup ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classifier_export")
+
+# --- Config ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, "waste_classifier")
+DATASET_PATH = os.path.join(SCRIPT_DIR, "data")
+
+
+class LogitsOnly(torch.nn.Module):
+    """Wrap the classifier so the exported graph has a single `logits` output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def export_onnx(model_path=MODEL_PATH, opset=17):
+    """Export the fp32 ONNX graph and a dynamically quantized INT8 variant"""
+    from transformers import AutoModelForImageClassification
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fp32_path = os.path.join(model_path, ONNX_FILES["onnx"])
+    int8_path = os.path.join(model_path, ONNX_FILES["onnx-int8"])
+    os.makedirs(os.path.dirname(fp32_path), exist_ok=True)
+
+    logger.info(f"Loading model from {model_path}")
+    model = AutoModelForImageClassification.from_pretrained(model_path, local_files_only=True)
+    model.eval()
+
+    size = model.config.image_size
+    dummy = torch.randn(1, model.config.num_channels, size, size)
+
+    # The TorchScript exporter; torch 2.5 added the `dynamo` switch and
+    # later releases default to the dynamo exporter
+    options = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        options["dynamo"] = False
+
+    logger.info(f"Exporting ONNX graph to {fp32_path}")
+    torch.onnx.export(
+        LogitsOnly(model),
+        (dummy,),
+        fp32_path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        **options,
+    )
+
+    logger.info(f"Quantizing to INT8 at {int8_path}")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    for path in (fp32_path, int8_path):
+        logger.info(f"{os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB")
+    return fp32_path, int8_path
+
+
+def load_test_split():
+    """Test split with the same seed-42 logic as train.py"""
+    from datasets import load_dataset
+
+    dataset = load_dataset("imagefolder", data_dir=DATASET_PATH)
+    split = dataset["train"].train_test_split(test_size=0.2, seed=42)
+    val_test = split["test"].train_test_split(test_size=0.5, seed=42)
+    return val_test["test"]
+
+
+def check_parity(model_path=MODEL_PATH, engines=("onnx", "onnx-int8"), batch_size=32):
+    """Compare ONNX engines against the fp32 PyTorch model on the test split"""
+    from transformers import AutoImageProcessor
+
+    image_processor = AutoImageProcessor.from_pretrained(model_path, local_files_only=True)
+    test_set = load_test_split()
+    labels = np.array(test_set["label"])
+
+    def run(engine):
+        model = load_model(model_path, engine)
+        model.eval()
+        all_probs = []
+        start = time.perf_counter()
+        for i in range(0, len(test_set), batch_size):
+            images = [img.convert("RGB") for img in test_set[i:i + batch_size]["image"]]
+            inputs = image_processor(images=images, return_tensors="pt")
+            with torch.no_grad():
+                logits = model(pixel_values=inputs["pixel_values"]).logits
+            all_probs.append(torch.softmax(logits, dim=1).numpy())
+        elapsed = time.perf_counter() - start
+        return np.concatenate(all_probs), elapsed
+
+    reference, reference_time = run("torch")
+    reference_preds = reference.argmax(axis=1)
+    report = {
+        "torch": {
+            "accuracy": float((reference_preds == labels).mean()),
+            "seconds": round(reference_time, 2),
+        }
+    }
+    logger.info(f"torch: accuracy={report['torch']['accuracy']:.4f} time={reference_time:.2f}s")
+
+    for engine in engines:
+        probs, elapsed = run(engine)
+        preds = probs.argmax(axis=1)
+        report[engine] = {
+            "accuracy": float((preds == labels).mean()),
+            "agreement_with_torch": float((preds == reference_preds).mean()),
+            "max_prob_diff": float(np.abs(probs - reference).max()),
+            "seconds": round(elapsed, 2),
+        }
+        logger.info(
+            f"{engine}: accuracy={report[engine]['accuracy']:.4f} "
+            f"agreement={report[engine]['agreement_with_torch']:.4f} "
+            f"max_prob_diff={report[engine]['max_prob_diff']:.4f} time={elapsed:.2f}s"
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the waste classifier to ONNX and INT8")
+    parser.add_argument("--model-path", default=MODEL_PATH, help="Checkpoint directory saved by train.py")
+    parser.add_argument("--skip-export", action="store_true", help="Only run the parity check")
+    parser.add_argument("--check-parity", action="store_true", help="Compare accuracy against fp32 on the test split")
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        export_onnx(args.model_path)
+    if args.check_parity:
+        check_parity(args.model_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
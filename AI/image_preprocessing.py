@@ -0,0 +1,132 @@
+import io
+import time
+import threading
+from contextlib import contextmanager
+from PIL import Image
+
+
+class ImageRejected(Exception):
+    """Upload that cannot or should not be decoded"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MemoryBudget:
+    """Bounds the memory used by decode buffers across concurrent requests.
+
+    `reserve(nbytes)` is a context manager held while an image is decoded.
+    A single reservation over `per_request_bytes` is rejected with a 413.
+    Otherwise it waits up to `timeout` seconds for room within
+    `total_bytes` and then gives up with a 503, so a burst of large photos
+    queues or is shed instead of exhausting the worker's memory.
+    """
+
+    def __init__(self, total_bytes, per_request_bytes=None, timeout=10.0):
+        self.total_bytes = total_bytes
+        self.per_request_bytes = min(per_request_bytes or total_bytes, total_bytes)
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._peak = 0
+        self._waited = 0
+        self._rejected = 0
+
+    @contextmanager
+    def reserve(self, nbytes):
+        if nbytes > self.per_request_bytes:
+            with self._condition:
+                self._rejected += 1
+            raise ImageRejected(
+                f"Image needs {nbytes} bytes to decode (max {self.per_request_bytes})", status_code=413
+            )
+
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            if self._in_use + nbytes > self.total_bytes:
+                self._waited += 1
+            while self._in_use + nbytes > self.total_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._rejected += 1
+                    raise ImageRejected("Server is busy decoding other uploads, retry shortly", status_code=503)
+                self._condition.wait(remaining)
+            self._in_use += nbytes
+            self._peak = max(self._peak, self._in_use)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_use -= nbytes
+                self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_use_bytes": self._in_use,
+                "peak_bytes": self._peak,
+                "total_bytes": self.total_bytes,
+                "per_request_bytes": self.per_request_bytes,
+                "waited": self._waited,
+                "rejected": self._rejected,
+            }
+
+
+def as_file(upload):
+    """Readable binary file for an upload given as bytes or a seekable file"""
+    if isinstance(upload, (bytes, bytearray, memoryview)):
+        return io.BytesIO(upload)
+    upload.seek(0)
+    return upload
+
+
+def load_image(upload, max_side=384, max_pixels=40_000_000, budget=None):
+    """Decode an upload to an RGB image no larger than `max_side` on its long edge.
+
+    `upload` is bytes or a seekable binary file, such as a spooled upload
+    stream, which is read directly rather than copied into memory first.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale by 1/2, 1/4
+    or 1/8 during decoding instead of materializing every pixel of a 12 MP
+    photo only to throw most of them away in the 224x224 processor. The
+    decode buffers are reserved from `budget` (a MemoryBudget) if given.
+    """
+    try:
+        image = Image.open(as_file(upload))
+    except Exception as e:
+        raise ImageRejected(f"Unsupported or corrupt image: {e}")
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected(f"Image is too large ({width}x{height} pixels)", status_code=413)
+
+    try:
+        # draft() keeps both sides >= the requested size, thumbnail() finishes the job
+        image.draft("RGB", (max_side, max_side))
+    except Exception as e:
+        raise ImageRejected(f"Unsupported or corrupt image: {e}")
+
+    # Decoded pixels at the (draft-reduced) size plus the RGB copy
+    width, height = image.size
+    decode_bytes = width * height * (len(image.getbands()) + 3)
+    with budget.reserve(decode_bytes) if budget is not None else _no_reservation():
+        try:
+            image = image.convert("RGB")
+            if max(image.size) > max_side:
+                image.thumbnail((max_side, max_side), Image.BILINEAR)
+        except Exception as e:
+            raise ImageRejected(f"Unsupported or corrupt image: {e}")
+    return image
+
+
+@contextmanager
+def _no_reservation():
+    yield
+
+
+def encode_jpeg(image, quality=90):
+    """Re-encode a (downscaled) image for forwarding upstream"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
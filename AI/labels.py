@@ -0,0 +1,41 @@
+"""Waste label metadata, shared by training, evaluation and the API.
+
+The table is built once at import. Callers read the same objects for every
+prediction rather than copying them, so treat them as read-only.
+"""
+
+# Label ids as trained: imagefolder's O (organic) = 0, R (recyclable) = 1
+LABEL2INFO = {
+    0: {
+        "label": "biodegradable",
+        "description": "Easily breaks down naturally. Good for composting.",
+        "recyclable": False,
+        "disposal": "Use compost or organic bin",
+        "example_items": ("banana peel", "food waste", "paper"),
+        "environmental_benefit": "Composting biodegradable waste returns nutrients to the soil, reduces landfill use, and lowers greenhouse gas emissions.",
+        "protection_tip": "Compost at home or use municipal organic waste bins. Avoid mixing with plastics or hazardous waste.",
+        "poor_disposal_effects": "If disposed of improperly, biodegradable waste can cause methane emissions in landfills and contribute to water pollution and eutrophication."
+    },
+    1: {
+        "label": "non_biodegradable",
+        "description": "Does not break down easily. Should be disposed of carefully.",
+        "recyclable": False,
+        "disposal": "Use general waste bin or recycling if possible",
+        "example_items": ("plastic bag", "styrofoam", "metal can"),
+        "environmental_benefit": "Proper disposal and recycling of non-biodegradable waste reduces pollution, conserves resources, and protects wildlife.",
+        "protection_tip": "Reduce use, reuse items, and recycle whenever possible. Never burn or dump in nature.",
+        "poor_disposal_effects": "Improper disposal leads to soil and water pollution, harms wildlife, and causes long-term environmental damage. Plastics can persist for hundreds of years."
+    }
+}
+
+ID2LABEL = {label_id: info["label"] for label_id, info in LABEL2INFO.items()}
+LABEL2ID = {label: label_id for label_id, label in ID2LABEL.items()}
+
+# Keyed by label name, the form predictions carry
+_INFO_BY_LABEL = {info["label"]: info for info in LABEL2INFO.values()}
+
+
+def label_info(label):
+    """Metadata for a predicted label name, or None for a label we do not know
+    (e.g. from a remote model with its own label set)"""
+    return _INFO_BY_LABEL.get(label)
@@ -0,0 +1,168 @@
+import os
+import time
+import logging
+import threading
+
+from image_preprocessing import load_image
+
+# torch and transformers are imported when a model is loaded, so importing
+# this module (e.g. for ENGINES in an argument parser) stays cheap
+
+logger = logging.getLogger("waste_classifier_inference")
+
+# Engines and the ONNX graphs they load, relative to the checkpoint directory
+ENGINES = ("torch", "onnx", "onnx-int8")
+ONNX_FILES = {
+    "onnx": os.path.join("onnx", "model.onnx"),
+    "onnx-int8": os.path.join("onnx", "model.int8.onnx"),
+}
+
+
+class OnnxImageClassifier:
+    """ONNX Runtime stand-in for the PyTorch classifier.
+
+    Called like the transformers model (`model(pixel_values=...)`) and
+    returns an output with `.logits`, so existing inference code can use
+    either engine unchanged.
+
+    The session is created on first use in each process. ORT's thread pool
+    does not survive a fork, and a preloaded gunicorn master would size it
+    before post_fork gives each worker its share of the cores. Without
+    `num_threads` it uses torch's thread count at that point.
+    """
+
+    def __init__(self, onnx_path, config, num_threads=None):
+        # Fail at load time, not on the first request, if onnxruntime is missing
+        import onnxruntime
+
+        self.onnx_path = onnx_path
+        self.config = config
+        self.num_threads = num_threads
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        pid = os.getpid()
+        if self._session_pid != pid:
+            with self._lock:
+                if self._session_pid != pid:
+                    self._session = self._create_session()
+                    self._session_pid = pid
+        return self._session
+
+    def _create_session(self):
+        import onnxruntime as ort
+        import torch
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+        logger.info(f"ONNX Runtime session for {self.onnx_path} using {options.intra_op_num_threads} threads")
+        return ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, pixel_values, **kwargs):
+        import torch
+        from transformers.modeling_outputs import ImageClassifierOutput
+
+        logits = self.session.run(["logits"], {"pixel_values": pixel_values.cpu().numpy()})[0]
+        return ImageClassifierOutput(logits=torch.from_numpy(logits))
+
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+
+def load_model(model_path, engine="torch"):
+    """Load the classifier for `engine` from a train.py checkpoint directory"""
+    import torch
+    from transformers import AutoConfig, AutoModelForImageClassification
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine: {engine}")
+
+    if engine == "torch":
+        return AutoModelForImageClassification.from_pretrained(model_path, local_files_only=True)
+
+    onnx_path = os.path.join(model_path, ONNX_FILES[engine])
+    if not os.path.exists(onnx_path):
+        raise FileNotFoundError(f"{onnx_path} not found, run export_onnx.py first")
+    config = AutoConfig.from_pretrained(model_path, local_files_only=True)
+    return OnnxImageClassifier(onnx_path, config)
+
+
+def warm_up(model, image_processor, batch_sizes=(1,)):
+    """Run dummy batches through the model and return the seconds taken.
+
+    The first forward passes pay for lazy initialisation (thread pools,
+    kernel selection, allocator growth); doing them up front keeps that
+    cost out of the first real requests and out of throughput timings.
+    """
+    import torch
+    from PIL import Image
+
+    size = image_processor.size
+    size = (size["width"], size["height"]) if "width" in size else (size["shortest_edge"],) * 2
+    image = Image.new("RGB", size)
+    start = time.perf_counter()
+    for batch_size in batch_sizes:
+        inputs = image_processor(images=[image] * batch_size, return_tensors="pt")
+        with torch.no_grad():
+            model(pixel_values=inputs["pixel_values"])
+    return time.perf_counter() - start
+
+
+class LocalClassifier:
+    """In-process classifier backed by the checkpoint saved by train.py.
+
+    Scores are calibrated with the temperature in the checkpoint's
+    calibration.json (see calibrate.py) when there is one.
+    """
+
+    def __init__(self, model_path, device="cpu", engine="torch"):
+        from transformers import AutoImageProcessor
+        from calibrate import load_temperature
+
+        logger.info(f"Loading local model from {model_path} (engine: {engine})")
+        self.model_path = model_path
+        self.device = device
+        self.engine = engine
+        self.model = load_model(model_path, engine)
+        self.image_processor = AutoImageProcessor.from_pretrained(model_path, local_files_only=True)
+        self.model.to(device)
+        self.model.eval()
+        self.id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+        self.temperature = load_temperature(model_path)
+        self.calibrated = self.temperature != 1.0
+
+    def predict(self, image_bytes):
+        """Classify raw image bytes.
+
+        Returns a list of {"label", "score"} dicts sorted by score, the same
+        shape as the Hugging Face Inference API response.
+        """
+        return self.predict_batch([load_image(image_bytes)])[0]
+
+    def warm_up(self, batch_sizes=(1,)):
+        return warm_up(self.model, self.image_processor, batch_sizes)
+
+    def predict_batch(self, images):
+        """Classify a list of RGB PIL images in a single forward pass"""
+        import torch
+        from calibrate import softmax, top_k
+
+        inputs = self.image_processor(images=images, return_tensors="pt")
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+        with torch.no_grad():
+            logits = self.model(**inputs).logits.float().cpu().numpy()
+
+        # Calibrate and rank the whole batch at once
+        label_ids, scores = top_k(softmax(logits, self.temperature), logits.shape[1])
+        id2label = self.id2label
+        return [
+            [{"label": id2label[label_id], "score": score} for label_id, score in zip(row_ids, row_scores)]
+            for row_ids, row_scores in zip(label_ids.tolist(), scores.tolist())
+        ]
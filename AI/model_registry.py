@@ -0,0 +1,329 @@
+import os
+import json
+import random
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger("waste_classification_registry")
+
+LOCAL = "local"
+REMOTE = "huggingface-api"
+
+VERSION_KEYS = {"path", "url", "engine"}
+
+# An applied configuration; replaced as a whole so readers never see a mix
+_Snapshot = namedtuple("_Snapshot", ["versions", "traffic", "fallback", "config"])
+
+
+class ModelVersion:
+    """One servable model: a local checkpoint or a remote inference endpoint.
+
+    Local versions own their classifier and MicroBatcher, so each version
+    batches its own forward passes.
+    """
+
+    def __init__(self, name, path=None, url=None, engine="torch"):
+        self.name = name
+        self.path = path
+        self.url = url
+        self.engine = engine
+        self.classifier = None
+        self.batcher = None
+
+    @property
+    def is_local(self):
+        return self.path is not None
+
+    @property
+    def source(self):
+        return LOCAL if self.is_local else REMOTE
+
+    @property
+    def spec(self):
+        if self.is_local:
+            return {"path": self.path, "engine": self.engine}
+        return {"url": self.url}
+
+    @property
+    def cache_namespace(self):
+        # Tied to the spec, so a name re-pointed at another checkpoint does
+        # not serve the old checkpoint's cached predictions
+        digest = hashlib.sha256(json.dumps(self.spec, sort_keys=True).encode()).hexdigest()
+        return f"{self.name}:{digest[:12]}"
+
+    def load(self, batch_max_size=16, batch_max_wait_ms=10):
+        if not self.is_local:
+            return
+        from batching import MicroBatcher
+        from local_inference import LocalClassifier
+        self.classifier = LocalClassifier(self.path, engine=self.engine)
+        self.batcher = MicroBatcher(
+            self.classifier.predict_batch,
+            max_batch_size=batch_max_size,
+            max_wait_ms=batch_max_wait_ms
+        )
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def stats(self):
+        stats = {"source": self.source, **self.spec}
+        if self.classifier is not None:
+            stats["calibration_temperature"] = self.classifier.temperature
+        if self.batcher is not None:
+            stats["batching"] = self.batcher.stats()
+        return stats
+
+
+class ModelRegistry:
+    """Loaded model versions and the traffic split between them.
+
+    A configuration names the versions, the share of traffic each one
+    gets (by default all of it goes to the first) and optionally a local
+    version to fall back on when a remote one fails:
+
+        {"versions": {"vit": {"path": "waste_classifier"},
+                      "vit-int8": {"path": "waste_classifier", "engine": "onnx-int8"},
+                      "hf": {"url": "https://api-inference.huggingface.co/models/..."}},
+         "traffic": {"vit": 90, "vit-int8": 10},
+         "fallback": "vit"}
+
+    `apply()` loads (and optionally warms) whatever is new, reusing
+    versions whose spec is unchanged, and only then swaps the whole
+    configuration in with one assignment. Requests in flight keep the
+    version they picked; retired versions are closed `retire_after`
+    seconds later.
+    """
+
+    def __init__(self, batch_max_size=16, batch_max_wait_ms=10, retire_after=60.0):
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.retire_after = retire_after
+        self._active = _Snapshot({}, [], None, None)
+        # Serialises apply(); choose() only reads the current snapshot
+        self._apply_lock = threading.Lock()
+        self._watch_pid = None
+        self._file_mtime = None
+
+    # --- Selection ---
+
+    def choose(self, routing_key=None, pinned=None):
+        """Version for a request.
+
+        `pinned` names a version explicitly. Otherwise the traffic split
+        decides, by a hash of `routing_key` so the same client keeps
+        getting the same version, or at random without one.
+        """
+        snapshot = self._active
+        if pinned:
+            if pinned not in snapshot.versions:
+                raise KeyError(f"Unknown model version: {pinned}")
+            return snapshot.versions[pinned]
+        if not snapshot.traffic:
+            raise RuntimeError("No model versions are loaded")
+
+        if routing_key is None:
+            point = random.random()
+        else:
+            digest = hashlib.sha256(routing_key.encode()).digest()
+            point = int.from_bytes(digest[:8], "big") / 2 ** 64
+        for bound, name in snapshot.traffic:
+            if point < bound:
+                return snapshot.versions[name]
+        return snapshot.versions[snapshot.traffic[-1][1]]
+
+    @property
+    def fallback(self):
+        return self._active.fallback
+
+    def fallback_for(self, version):
+        """Local version to answer for a failing remote `version`, or None"""
+        fallback = self._active.fallback
+        if version.is_local or fallback is None:
+            return None
+        return fallback
+
+    @property
+    def default(self):
+        """The version with the largest share of traffic"""
+        snapshot = self._active
+        if not snapshot.traffic:
+            return None
+        shares = traffic_shares(snapshot.traffic)
+        return snapshot.versions[max(shares, key=shares.get)]
+
+    def versions(self):
+        return list(self._active.versions.values())
+
+    @property
+    def config(self):
+        return self._active.config
+
+    # --- Configuration ---
+
+    def apply(self, config, base_dir=None, warm=None):
+        """Load a configuration and make it live atomically.
+
+        `warm(version)` is called for each newly loaded local version
+        before it receives traffic. Raises ValueError for an invalid
+        configuration; on any error the current models keep serving.
+        """
+        specs, weights, fallback_name = parse_config(config, base_dir)
+
+        with self._apply_lock:
+            current = self._active
+            versions = {}
+            loaded = []
+            try:
+                for name, spec in specs.items():
+                    existing = current.versions.get(name)
+                    if existing is not None and existing.spec == ModelVersion(name, **spec).spec:
+                        versions[name] = existing
+                        continue
+                    version = ModelVersion(name, **spec)
+                    version.load(self.batch_max_size, self.batch_max_wait_ms)
+                    loaded.append(version)
+                    if warm is not None and version.is_local:
+                        warm(version)
+                    versions[name] = version
+            except Exception:
+                for version in loaded:
+                    version.close()
+                raise
+
+            total = float(sum(weights.values()))
+            traffic = []
+            bound = 0.0
+            for name, weight in weights.items():
+                if weight > 0:
+                    bound += weight / total
+                    traffic.append((bound, name))
+
+            self._active = _Snapshot(
+                versions, traffic, versions.get(fallback_name), config
+            )
+
+        retired = [v for name, v in current.versions.items() if versions.get(name) is not v]
+        for version in retired:
+            timer = threading.Timer(self.retire_after, version.close)
+            timer.daemon = True
+            timer.start()
+
+        logger.info(
+            f"Model registry now serving {traffic_shares(traffic)} "
+            f"(loaded {[v.name for v in loaded]}, retired {[v.name for v in retired]})"
+        )
+        return self.stats()
+
+    def load_file(self, path, warm=None):
+        mtime = os.stat(path).st_mtime_ns
+        with open(path) as f:
+            config = json.load(f)
+        stats = self.apply(config, base_dir=os.path.dirname(os.path.abspath(path)), warm=warm)
+        self._file_mtime = mtime
+        return stats
+
+    def save_file(self, path, config):
+        """Atomically replace the registry file, e.g. so other workers pick up a change"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".registry-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(config, f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._file_mtime = os.stat(path).st_mtime_ns
+
+    def watch(self, path, interval=5.0, warm=None):
+        """Reload `path` whenever it changes, from a thread in this process.
+
+        Safe to call repeatedly; each process (e.g. each forked worker)
+        starts one watcher.
+        """
+        pid = os.getpid()
+        if self._watch_pid == pid:
+            return
+        self._watch_pid = pid
+        threading.Thread(target=self._watch, args=(path, interval, warm), daemon=True).start()
+
+    def _watch(self, path, interval, warm):
+        stop = threading.Event()
+        while not stop.wait(interval):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._file_mtime:
+                continue
+            try:
+                self.load_file(path, warm=warm)
+            except Exception as e:
+                # Do not retry the same broken file on every poll
+                self._file_mtime = mtime
+                logger.error(f"Failed to reload model registry, keeping the current models: {e}")
+
+    def stats(self):
+        snapshot = self._active
+        shares = traffic_shares(snapshot.traffic)
+        return {
+            "versions": {
+                name: {**version.stats(), "traffic": round(shares.get(name, 0.0), 4)}
+                for name, version in snapshot.versions.items()
+            },
+            "fallback": snapshot.fallback.name if snapshot.fallback is not None else None,
+        }
+
+
+def traffic_shares(traffic):
+    """{name: fraction} from the cumulative (bound, name) list"""
+    shares = {}
+    previous = 0.0
+    for bound, name in traffic:
+        shares[name] = bound - previous
+        previous = bound
+    return shares
+
+
+def parse_config(config, base_dir=None):
+    """Validate a registry configuration into (specs, traffic weights, fallback name)"""
+    if not isinstance(config, dict):
+        raise ValueError("Registry configuration must be a JSON object")
+    versions = config.get("versions")
+    if not isinstance(versions, dict) or not versions:
+        raise ValueError("Registry configuration needs a non-empty 'versions' object")
+
+    specs = {}
+    for name, spec in versions.items():
+        if not isinstance(spec, dict) or set(spec) - VERSION_KEYS:
+            raise ValueError(f"Version {name!r}: expected an object with 'path' or 'url' and optional 'engine'")
+        if ("path" in spec) == ("url" in spec):
+            raise ValueError(f"Version {name!r} needs exactly one of 'path' or 'url'")
+        spec = dict(spec)
+        if "path" in spec and base_dir and not os.path.isabs(spec["path"]):
+            spec["path"] = os.path.normpath(os.path.join(base_dir, spec["path"]))
+        if "url" in spec and "engine" in spec:
+            raise ValueError(f"Version {name!r}: 'engine' only applies to local checkpoints")
+        specs[name] = spec
+
+    weights = config.get("traffic") or {next(iter(specs)): 1}
+    if not isinstance(weights, dict):
+        raise ValueError("'traffic' must map version names to weights")
+    for name, weight in weights.items():
+        if name not in specs:
+            raise ValueError(f"'traffic' refers to unknown version {name!r}")
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Traffic weight for {name!r} must be a non-negative number")
+    if sum(weights.values()) <= 0:
+        raise ValueError("At least one version needs a positive traffic weight")
+
+    fallback = config.get("fallback")
+    if fallback is not None and "path" not in specs.get(fallback, {}):
+        raise ValueError(f"Fallback {fallback!r} must be a local version")
+
+    return specs, weights, fallback
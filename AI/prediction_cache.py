@@ -0,0 +1,138 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from process_local import SQLiteConnections
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class PredictionCache:
+    """LRU cache of predictions keyed on a hash of the uploaded image bytes.
+
+    Entries expire after `ttl_seconds`. When `shared_path` is given, entries
+    are also written to a SQLite file so that every worker process on the
+    host can reuse each other's results.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, shared_path=None, shared_max_entries=100000):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.shared_path = shared_path
+        self.shared_max_entries = shared_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = SQLiteConnections(shared_path, timeout=5) if shared_path else None
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._shared_writes = 0
+
+        if shared_path:
+            self._connections.get().execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key_for(image, namespace=""):
+        """Hash of an upload given as bytes or a seekable binary file.
+
+        Files are hashed in chunks and rewound, so large uploads never
+        have to be held in memory as one bytes object.
+        """
+        digest = hashlib.sha256(namespace.encode())
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            digest.update(image)
+        else:
+            image.seek(0)
+            for chunk in iter(lambda: image.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+            image.seek(0)
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._shared_get(key, now) if self.shared_path else None
+
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._shared_hits += 1
+            self._store(key, value, now + self.ttl)
+        return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.shared_path:
+            self._shared_set(key, value, expires_at)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "shared": bool(self.shared_path),
+                "hits": self._hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Shared SQLite tier ---
+
+    def _shared_get(self, key, now):
+        try:
+            row = self._connections.get().execute(
+                "SELECT value FROM predictions WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _shared_set(self, key, value, expires_at):
+        try:
+            conn = self._connections.get()
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            with self._lock:
+                self._shared_writes += 1
+                prune = self._shared_writes % 1000 == 0
+            if prune:
+                self._shared_prune(conn)
+        except sqlite3.Error:
+            pass
+
+    def _shared_prune(self, conn):
+        conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM predictions WHERE key IN ("
+            "SELECT key FROM predictions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.shared_max_entries,)
+        )
@@ -0,0 +1,57 @@
+"""State that must be recreated in each process.
+
+serve.py forks its workers from a preloaded master. Threads started in the
+master do not exist in the workers, and a SQLite connection must not be
+used from another thread or process. Components therefore create both
+lazily, per process, through these helpers.
+"""
+import os
+import sqlite3
+import threading
+
+
+class SQLiteConnections:
+    """One connection to a SQLite file per thread and process, opened on first use"""
+
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ProcessThreads:
+    """Runs `start()` once in each process to start a component's background threads.
+
+    Call `ensure()` before each use. `start` runs while `lock` is held, so
+    it must not take the lock itself; pass the component's own lock to
+    order it with the component's other state.
+    """
+
+    def __init__(self, start, lock=None):
+        self._start = start
+        self._lock = lock or threading.Lock()
+        self._pid = None
+
+    @property
+    def running(self):
+        """True once `start()` has run in this process; read with the lock held"""
+        return self._pid == os.getpid()
+
+    def ensure(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid != pid:
+                self._start()
+                self._pid = pid
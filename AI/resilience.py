@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected with CircuitOpenError without touching the network.
+    Once `recovery_timeout` seconds have passed a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+
+    Callers bracket each upstream call with `before_call()` and
+    `record_success()` / `record_failure()`. A call that ends without an
+    outcome calls `release()`, but only if `before_call()` returned True,
+    i.e. it was the half-open trial call.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now.
+
+        Returns True if this call is the half-open trial call.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            retry_after = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """Give up the trial call without an outcome, e.g. when it was cancelled"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+                "retry_after_seconds": (
+                    round(max(0.0, self._opened_at + self.recovery_timeout - time.monotonic()), 1)
+                    if state == OPEN else 0.0
+                ),
+            }
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return self._state
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for picking a hedge delay"""
+
+    def __init__(self, window=500, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Latency at `fraction` of the window, or None until there are enough samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def hedged_call(pool, delay, fn, *args, on_hedge=None):
+    """Call `fn(*args)` in `pool`, racing a second copy if it is slow.
+
+    If the first call has not finished after `delay` seconds, an identical
+    call is started and whichever succeeds first wins. The loser keeps
+    running in the pool and its result is discarded, so `fn` must be
+    idempotent. If both fail, the last error is raised.
+    """
+    first = pool.submit(fn, *args)
+    if delay is None:
+        return first.result()
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    if on_hedge is not None:
+        on_hedge()
+    pending = {first, pool.submit(fn, *args)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
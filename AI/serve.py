@@ -0,0 +1,157 @@
+import os
+import gc
+import sys
+import logging
+import argparse
+import importlib
+
+from gunicorn.app.base import BaseApplication
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classification_serve")
+
+# ===============================
+# Configuration
+# ===============================
+
+CPU_COUNT = os.cpu_count() or 1
+
+# "flask" serves waste_classification_api with threaded workers,
+# "async" serves waste_classification_async with aiohttp workers
+SERVERS = {
+    "flask": ("waste_classification_api", "gthread"),
+    "async": ("waste_classification_async", "aiohttp.GunicornWebWorker"),
+}
+
+# Dropped from sys.modules on reload; the async app wraps the Flask module
+APP_MODULES = ("waste_classification_api", "waste_classification_async")
+
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", min(4, CPU_COUNT)))
+THREADS = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Request threads per Flask worker kept out of admission control, so
+# /health, /ready and /metrics are still answered when /predict is saturated
+PRIORITY_THREADS = int(os.environ.get("PRIORITY_THREADS", 2))
+
+# Torch intra-op threads per worker; by default the cores are split evenly
+# so N workers do not each start a thread per core
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", 0))
+
+
+def torch_threads_per_worker(workers):
+    return TORCH_THREADS or max(1, CPU_COUNT // workers)
+
+
+def size_admission_to_threads(threads):
+    """Default the API's admission limits so inference never occupies every request thread.
+
+    Half the threads handle inference, the rest wait for a slot, except
+    PRIORITY_THREADS which stay free. Explicit ADMISSION_* settings win.
+    """
+    active = max(1, threads // 2)
+    os.environ.setdefault("ADMISSION_MAX_ACTIVE", str(active))
+    os.environ.setdefault("ADMISSION_QUEUE_SIZE", str(max(0, threads - active - PRIORITY_THREADS)))
+
+
+# ===============================
+# Gunicorn Application
+# ===============================
+
+class WasteClassificationServer(BaseApplication):
+    """Gunicorn launcher that loads the model once, before forking.
+
+    With preload the app module (and with it the model weights) is
+    imported in the master process. Workers are forked from it and share
+    those pages copy-on-write. gc.freeze() moves the loaded objects out of
+    the collector's reach, so garbage collection in the workers does not
+    touch, and thereby copy, them.
+
+    SIGHUP re-imports the app in the master, picking up a new checkpoint
+    or code, then replaces the workers gracefully. If the new app fails to
+    load, the previous one keeps serving.
+    """
+
+    def __init__(self, module_name, options):
+        self.module_name = module_name
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Let the previous app's objects be collected on reload
+        gc.unfreeze()
+        for name in APP_MODULES:
+            sys.modules.pop(name, None)
+        module = importlib.import_module(self.module_name)
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Loaded {self.module_name} in master process {os.getpid()}")
+        return module.app
+
+    def reload(self):
+        super().reload()
+        if not self.cfg.preload_app:
+            return
+        previous = self.callable
+        self.callable = None
+        try:
+            self.wsgi()
+        except Exception:
+            logger.exception("Reload failed, keeping the previously loaded app")
+            self.callable = previous
+
+
+def post_fork(server, worker):
+    # Only pin torch when the app actually loaded it (local inference)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        threads = torch_threads_per_worker(server.cfg.workers)
+        torch.set_num_threads(threads)
+        server.log.info(f"Worker {worker.pid}: torch using {threads} threads")
+
+    # Warm the model in the worker; the master must not run a forward pass
+    api = sys.modules.get("waste_classification_api")
+    if api is not None:
+        api.start_warm_up()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the waste classification API under gunicorn")
+    parser.add_argument("--server", choices=sorted(SERVERS), default=os.environ.get("SERVER", "flask"))
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 10000)))
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS, help="Request threads per Flask worker")
+    parser.add_argument("--timeout", type=int, default=int(os.environ.get("GUNICORN_TIMEOUT", 60)))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("GRACEFUL_TIMEOUT", 30)))
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Load the app in each worker instead of once in the master")
+    args = parser.parse_args()
+
+    module_name, worker_class = SERVERS[args.server]
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": worker_class,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": int(os.environ.get("KEEPALIVE", 5)),
+        "preload_app": not args.no_preload,
+        "post_fork": post_fork,
+    }
+    if args.server == "flask":
+        options["threads"] = args.threads
+        size_admission_to_threads(args.threads)
+
+    logger.info(
+        f"Starting {args.workers} {args.server} workers on {options['bind']} "
+        f"({torch_threads_per_worker(args.workers)} torch threads each)"
+    )
+    WasteClassificationServer(module_name, options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+
+# --- Logging setup ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classifier_shards")
+
+# --- Config ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(SCRIPT_DIR, "data")
+SHARDS_PATH = os.path.join(SCRIPT_DIR, "data_shards")
+INDEX_FILE = "index.json"
+SPLIT_SEED = 42
+
+
+def compile_shards(dataset_path=DATASET_PATH, output_dir=SHARDS_PATH, image_size=224, shard_size=4096):
+    """Decode, resize and split the image folder once into uint8 NumPy shards.
+
+    Uses the same seed-42 80/10/10 split as train.py. Each split is written
+    as `<split>-NNNNN.images.npy` (N x H x W x 3 uint8) and
+    `<split>-NNNNN.labels.npy` files, described by index.json.
+    """
+    from datasets import load_dataset
+    from PIL import Image
+
+    logger.info(f"Loading dataset from {dataset_path}")
+    dataset = load_dataset("imagefolder", data_dir=dataset_path)
+    label_names = dataset["train"].features["label"].names
+    # Same O/R relabeling as train.py
+    flip_labels = label_names == ['R', 'O']
+
+    split = dataset["train"].train_test_split(test_size=0.2, seed=SPLIT_SEED)
+    val_test = split["test"].train_test_split(test_size=0.5, seed=SPLIT_SEED)
+    splits = {"train": split["train"], "val": val_test["train"], "test": val_test["test"]}
+
+    os.makedirs(output_dir, exist_ok=True)
+    index = {
+        "image_size": image_size,
+        "label_names": label_names,
+        "seed": SPLIT_SEED,
+        "source": os.path.abspath(dataset_path),
+        "splits": {},
+    }
+
+    for split_name, split_set in splits.items():
+        start = time.perf_counter()
+        shards = []
+        for shard_id, offset in enumerate(range(0, len(split_set), shard_size)):
+            count = min(shard_size, len(split_set) - offset)
+            images_file = f"{split_name}-{shard_id:05d}.images.npy"
+            labels_file = f"{split_name}-{shard_id:05d}.labels.npy"
+
+            # Write straight to disk so a shard never has to fit in memory
+            images = np.lib.format.open_memmap(
+                os.path.join(output_dir, images_file), mode="w+",
+                dtype=np.uint8, shape=(count, image_size, image_size, 3)
+            )
+            labels = np.empty(count, dtype=np.int64)
+            for i in range(count):
+                example = split_set[offset + i]
+                image = example["image"].convert("RGB").resize((image_size, image_size), Image.BILINEAR)
+                images[i] = np.asarray(image, dtype=np.uint8)
+                labels[i] = 1 - example["label"] if flip_labels else example["label"]
+            images.flush()
+            del images
+            np.save(os.path.join(output_dir, labels_file), labels)
+
+            shards.append({"images": images_file, "labels": labels_file, "count": count})
+
+        index["splits"][split_name] = {"num_examples": len(split_set), "shards": shards}
+        logger.info(
+            f"{split_name}: {len(split_set)} images in {len(shards)} shards "
+            f"({time.perf_counter() - start:.1f}s)"
+        )
+
+    with open(os.path.join(output_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=2)
+    logger.info(f"Shards written to {os.path.abspath(output_dir)}")
+    return index
+
+
+class ShardDataset:
+    """Map-style dataset over compiled shards, read through memory maps.
+
+    Items are {"pixel_values": float tensor (3, H, W), "label": int},
+    normalized with `image_mean`/`image_std` the way the image processor
+    does, so it can be used directly with train.py's collate_fn.
+    """
+
+    def __init__(self, shards_dir, split, image_mean=(0.5, 0.5, 0.5), image_std=(0.5, 0.5, 0.5)):
+        with open(os.path.join(shards_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        shards = self.index["splits"][split]["shards"]
+        self.images = [np.load(os.path.join(shards_dir, s["images"]), mmap_mode="r") for s in shards]
+        self.labels = [np.load(os.path.join(shards_dir, s["labels"]), mmap_mode="r") for s in shards]
+        self.offsets = np.cumsum([0] + [s["count"] for s in shards])
+        # Fold rescale (1/255) and normalization into one multiply-add
+        mean = np.asarray(image_mean, dtype=np.float32)
+        std = np.asarray(image_std, dtype=np.float32)
+        self.scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        self.shift = (-mean / std).reshape(3, 1, 1)
+
+    @property
+    def label_names(self):
+        return self.index["label_names"]
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        import torch
+
+        if idx < 0:
+            idx += len(self)
+        shard = int(np.searchsorted(self.offsets, idx, side="right")) - 1
+        row = idx - self.offsets[shard]
+        image = self.images[shard][row].transpose(2, 0, 1)
+        pixel_values = image.astype(np.float32) * self.scale + self.shift
+        return {"pixel_values": torch.from_numpy(pixel_values), "label": int(self.labels[shard][row])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the image folder into memory-mapped tensor shards")
+    parser.add_argument("--data", default=DATASET_PATH, help="Image folder dataset")
+    parser.add_argument("--output", default=SHARDS_PATH, help="Shard output directory")
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--shard-size", type=int, default=4096, help="Images per shard file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        logger.error(f"Dataset path does not exist: {args.data}")
+        return 1
+    compile_shards(args.data, args.output, args.image_size, args.shard_size)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
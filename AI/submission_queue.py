@@ -0,0 +1,284 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from process_local import ProcessThreads, SQLiteConnections
+
+logger = logging.getLogger("waste_submission_queue")
+
+# Never written to the database; kept in the enqueuing process's memory
+SENSITIVE_HEADERS = {"authorization", "proxy-authorization", "cookie"}
+
+
+class SubmissionQueue:
+    """Durable SQLite-backed queue of backend submissions.
+
+    Requests enqueue a payload and return immediately. Worker threads claim
+    pending rows in batches, POST them through `send(url, payload, headers)`
+    and delete them on success. Each row's lease is renewed just before its
+    POST, so a slow backend cannot let another worker claim and resend a row
+    that is still in the batch. Failures are retried with exponential
+    backoff; rows that exhaust `max_attempts` or get a non-retryable 4xx are
+    kept with status "dead" for `dead_retention` seconds for inspection.
+
+    Credentials such as the caller's Authorization header are not persisted.
+    They stay in the memory of the process that enqueued the row, which
+    delivers its own rows. Rows left behind by a process that has stopped
+    (no heartbeat for `orphan_after` seconds) are sent with
+    `fallback_headers`, or dead-lettered without them.
+    """
+
+    def __init__(self, path, send, workers=2, batch_size=20, max_attempts=8,
+                 base_backoff=1.0, max_backoff=300.0, lease_seconds=60.0, poll_interval=0.5,
+                 fallback_headers=None, orphan_after=30.0, dead_retention=7 * 24 * 3600.0,
+                 purge_interval=3600.0):
+        self.path = path
+        self.send = send
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.fallback_headers = fallback_headers or {}
+        self.orphan_after = orphan_after
+        self.dead_retention = dead_retention
+        self.purge_interval = purge_interval
+        self._connections = SQLiteConnections(path)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = ProcessThreads(self._start_workers, self._lock)
+        self._owner = None
+        # row id -> sensitive headers, for rows this process enqueued
+        self._credentials = {}
+        self._purged_at = 0.0
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+        self._purged = 0
+
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "url TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "headers TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, "
+            "next_attempt_at REAL NOT NULL, "
+            "claimed_until REAL NOT NULL DEFAULT 0, "
+            "last_error TEXT)"
+        )
+        columns = {row[1] for row in self._connections.get().execute("PRAGMA table_info(submissions)")}
+        if "owner" not in columns:
+            # Queues created before credentials were kept out of the database
+            self._connections.get().execute("ALTER TABLE submissions ADD COLUMN owner TEXT")
+        self._connections.get().execute(
+            "CREATE INDEX IF NOT EXISTS submissions_due ON submissions (status, next_attempt_at)"
+        )
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+        )
+
+    def enqueue(self, url, payload, headers=None):
+        """Persist a submission and return its id"""
+        self._threads.ensure()
+        headers = headers or {}
+        stored = {k: v for k, v in headers.items() if k.lower() not in SENSITIVE_HEADERS}
+        credentials = {k: v for k, v in headers.items() if k.lower() in SENSITIVE_HEADERS}
+        now = time.time()
+        # Held until the credentials are registered, so a worker that
+        # claims the row at once still finds them
+        with self._lock:
+            cursor = self._connections.get().execute(
+                "INSERT INTO submissions (url, payload, headers, owner, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(payload), json.dumps(stored), self._owner, now, now)
+            )
+            row_id = cursor.lastrowid
+            if credentials:
+                self._credentials[row_id] = credentials
+        self._wakeup.set()
+        return row_id
+
+    def stats(self):
+        self._threads.ensure()
+        now = time.time()
+        pending, oldest, due = self._connections.get().execute(
+            "SELECT COUNT(*), MIN(created_at), SUM(next_attempt_at <= ?) "
+            "FROM submissions WHERE status = 'pending'",
+            (now,)
+        ).fetchone()
+        dead = self._connections.get().execute(
+            "SELECT COUNT(*) FROM submissions WHERE status = 'dead'"
+        ).fetchone()[0]
+        with self._lock:
+            return {
+                "pending": pending,
+                "due": due or 0,
+                "dead": dead,
+                "lag_seconds": round(now - oldest, 3) if oldest else 0.0,
+                "sent": self._sent,
+                "retried": self._retried,
+                "dead_lettered": self._dead,
+                "purged": self._purged,
+                "workers": self.workers,
+            }
+
+    # --- Workers ---
+
+    def _start_workers(self):
+        self._wakeup = threading.Event()
+        # Credentials held by the parent belong to the parent's rows
+        self._owner = uuid.uuid4().hex
+        self._credentials = {}
+        self._beat()
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+        for _ in range(self.workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _beat(self):
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO owners (owner, heartbeat_at) VALUES (?, ?)", (self._owner, time.time())
+        )
+
+    def _heartbeat(self):
+        """Mark this process alive, apart from the workers so slow POSTs cannot delay it"""
+        owner = self._owner
+        while owner == self._owner:
+            time.sleep(self.orphan_after / 3)
+            try:
+                self._beat()
+            except sqlite3.Error as e:
+                logger.error(f"Submission queue heartbeat failed: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                self._purge_dead_rows()
+                batch = self._claim()
+                for row in batch:
+                    self._deliver(*row)
+            except Exception as e:
+                # Keep the thread alive; nothing would restart it
+                logger.error(f"Submission worker error: {e}")
+                batch = []
+
+            if not batch:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _purge_dead_rows(self):
+        """Bounded purge of dead rows past their retention"""
+        now = time.time()
+        conn = self._connections.get()
+        if now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            purged = conn.execute(
+                "DELETE FROM submissions WHERE id IN ("
+                "SELECT id FROM submissions WHERE status = 'dead' AND created_at < ? LIMIT 1000)",
+                (now - self.dead_retention,)
+            ).rowcount
+            conn.execute("DELETE FROM owners WHERE heartbeat_at < ?", (now - self.dead_retention,))
+            if purged:
+                logger.info(f"Purged {purged} dead submissions older than {self.dead_retention:.0f}s")
+                with self._lock:
+                    self._purged += purged
+
+    def _claim(self):
+        """Lease due rows owned by this process or by one that has stopped"""
+        now = time.time()
+        conn = self._connections.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, url, payload, headers, attempts, owner FROM submissions "
+                "WHERE status = 'pending' AND next_attempt_at <= ? AND claimed_until <= ? "
+                "AND (owner = ? OR owner IS NULL OR owner NOT IN "
+                "(SELECT owner FROM owners WHERE heartbeat_at > ?)) "
+                "ORDER BY id LIMIT ?",
+                (now, now, self._owner, now - self.orphan_after, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE submissions SET claimed_until = ? WHERE id = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(*row, now + self.lease_seconds) for row in rows]
+
+    def _renew_lease(self, row_id, lease):
+        """Extend our lease on a row right before sending it; False if it is no longer ours"""
+        renewed = time.time() + self.lease_seconds
+        updated = self._connections.get().execute(
+            "UPDATE submissions SET claimed_until = ? WHERE id = ? AND claimed_until = ? AND status = 'pending'",
+            (renewed, row_id, lease)
+        ).rowcount
+        return updated == 1
+
+    def _deliver(self, row_id, url, payload, headers, attempts, owner, lease):
+        if not self._renew_lease(row_id, lease):
+            return
+
+        conn = self._connections.get()
+        headers = json.loads(headers)
+        if owner == self._owner:
+            with self._lock:
+                headers.update(self._credentials.get(row_id, {}))
+        elif owner is not None:
+            if not self.fallback_headers:
+                self._dead_letter(
+                    conn, row_id, attempts,
+                    "Credentials unavailable: the process that queued this submission has stopped"
+                )
+                return
+            headers.update(self.fallback_headers)
+        # Rows without an owner predate this scheme and carry their own headers
+
+        try:
+            status_code = self.send(url, json.loads(payload), headers)
+            error = None if 200 <= status_code < 300 else f"HTTP {status_code}"
+        except Exception as e:
+            status_code = None
+            error = str(e) or e.__class__.__name__
+
+        if error is None:
+            conn.execute("DELETE FROM submissions WHERE id = ?", (row_id,))
+            with self._lock:
+                self._sent += 1
+                self._credentials.pop(row_id, None)
+            return
+
+        attempts += 1
+        retryable = status_code is None or status_code >= 500 or status_code in (408, 429)
+        if not retryable or attempts >= self.max_attempts:
+            self._dead_letter(conn, row_id, attempts, error)
+            return
+
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        conn.execute(
+            "UPDATE submissions SET attempts = ?, last_error = ?, next_attempt_at = ?, claimed_until = 0 "
+            "WHERE id = ?",
+            (attempts, error, time.time() + backoff * random.uniform(0.5, 1.0), row_id)
+        )
+        with self._lock:
+            self._retried += 1
+
+    def _dead_letter(self, conn, row_id, attempts, error):
+        logger.error(f"Submission {row_id} failed permanently after {attempts} attempts: {error}")
+        conn.execute(
+            "UPDATE submissions SET status = 'dead', attempts = ?, last_error = ?, claimed_until = 0 "
+            "WHERE id = ?",
+            (attempts, error, row_id)
+        )
+        with self._lock:
+            self._dead += 1
+            self._credentials.pop(row_id, None)
@@ -1,13 +1,14 @@
 import os
 import logging
-from datasets import load_dataset
-from transformers import AutoImageProcessor, AutoModelForImageClassification
-from torchvision import transforms
-import torch
-from PIL import Image
-import numpy as np
 import json
-import sys
+import argparse
+import time
+
+# torch, transformers and datasets are imported on demand, so `--help`
+# and argument errors return immediately
+from calibrate import load_temperature, softmax, top_k as rank_top_k
+from labels import LABEL2INFO
+from local_inference import ENGINES, load_model, warm_up
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO)
@@ -16,134 +17,214 @@ logger = logging.getLogger("waste_classifier_test")
 # --- Config ---
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "waste_classifier")
 DATASET_PATH = os.path.join(os.path.dirname(__file__), "data")
-LABEL2INFO = {
-    0: {
-        "label": "biodegradable",
-        "description": "Easily breaks down naturally. Good for composting.",
-        "recyclable": False,
-        "disposal": "Use compost or organic bin",
-        "example_items": ["banana peel", "food waste", "paper"],
-        "environmental_benefit": "Composting biodegradable waste returns nutrients to the soil, reduces landfill use, and lowers greenhouse gas emissions.",
-        "protection_tip": "Compost at home or use municipal organic waste bins. Avoid mixing with plastics or hazardous waste.",
-        "poor_disposal_effects": "If disposed of improperly, biodegradable waste can cause methane emissions in landfills and contribute to water pollution and eutrophication."
-    },
-    1: {
-        "label": "non_biodegradable",
-        "description": "Does not break down easily. Should be disposed of carefully.",
-        "recyclable": False,
-        "disposal": "Use general waste bin or recycling if possible",
-        "example_items": ["plastic bag", "styrofoam", "metal can"],
-        "environmental_benefit": "Proper disposal and recycling of non-biodegradable waste reduces pollution, conserves resources, and protects wildlife.",
-        "protection_tip": "Reduce use, reuse items, and recycle whenever possible. Never burn or dump in nature.",
-        "poor_disposal_effects": "Improper disposal leads to soil and water pollution, harms wildlife, and causes long-term environmental damage. Plastics can persist for hundreds of years."
-    }
-}
 
-# --- Load model and processor ---
-logger.info(f"Loading model from {MODEL_PATH}")
-model = AutoModelForImageClassification.from_pretrained(MODEL_PATH)
-image_processor = AutoImageProcessor.from_pretrained(MODEL_PATH)
-model.eval()
+# --- Model and processor (loaded in main for the selected engine) ---
+model = None
+image_processor = None
+temperature = 1.0
+
+def load_model_and_processor(engine="torch", model_path=MODEL_PATH):
+    """Load the classifier for `engine` ("torch", "onnx" or "onnx-int8")"""
+    global model, image_processor, temperature
+    from transformers import AutoImageProcessor
+
+    logger.info(f"Loading model from {model_path} (engine: {engine})")
+    start = time.perf_counter()
+    model = load_model(model_path, engine)
+    image_processor = AutoImageProcessor.from_pretrained(model_path)
+    model.eval()
+    temperature = load_temperature(model_path)
+    if temperature != 1.0:
+        logger.info(f"Calibrating probabilities with temperature {temperature:.4f}")
+    logger.info(f"Model loaded in {time.perf_counter() - start:.2f}s")
 
-def predict_image(image_path, model, image_processor, device="cpu"):
+def predict_image(image_path, model, image_processor, device="cpu", top_k=1):
     """Predict waste classification for a single image"""
+    import torch
+    from PIL import Image
+
     try:
         image = Image.open(image_path).convert("RGB")
         inputs = image_processor(images=image, return_tensors="pt")
         inputs = {k: v.to(device) for k, v in inputs.items()}
         
         with torch.no_grad():
-            outputs = model(**inputs)
-            probs = torch.softmax(outputs.logits, dim=1)
-            conf, pred = torch.max(probs, dim=1)
-            label_id = pred.item()
-            confidence = conf.item()
+            logits = model(**inputs).logits.float().cpu().numpy()
+        label_ids, probs = rank_top_k(softmax(logits, temperature), top_k)
+        label_ids, probs = label_ids[0].tolist(), probs[0].tolist()
         
-        info = LABEL2INFO[label_id].copy()
-        info["confidence"] = round(confidence, 2)
-        info["image_path"] = image_path
-        return info
+        # The label's fields plus confidence and path, without modifying the shared entry
+        result = {
+            **LABEL2INFO[label_ids[0]],
+            "confidence": round(probs[0], 2),
+            "image_path": image_path
+        }
+        if top_k > 1:
+            result["top_k"] = [
+                {"label": LABEL2INFO[label_id]["label"], "confidence": round(prob, 4)}
+                for label_id, prob in zip(label_ids, probs)
+            ]
+        return result
     
     except Exception as e:
         logger.error(f"Error processing image {image_path}: {str(e)}")
         return {"error": str(e)}
 
-def evaluate_on_test():
-    """Evaluate model on test dataset - FIXED VERSION"""
-    logger.info(f"Loading test set from {DATASET_PATH}")
-    dataset = load_dataset("imagefolder", data_dir=DATASET_PATH)
-    
-    # Use the same split logic as train.py
-    split = dataset["train"].train_test_split(test_size=0.2, seed=42)
-    val_test = split["test"].train_test_split(test_size=0.5, seed=42)
-    test_set = val_test["test"]
+def evaluate_on_test(batch_size=32, num_workers=0, shards_dir=None):
+    """Evaluate model on test dataset in batches"""
+    import numpy as np
+    import torch
+    from torch.utils.data import DataLoader
+
+    def collate(batch):
+        pixel_values = torch.stack([item["pixel_values"] for item in batch])
+        labels = torch.tensor([item["label"] for item in batch], dtype=torch.long)
+        return pixel_values, labels
     
-    # Preprocessing function - FIXED
-    def preprocess(example):
-        img = example["image"]
-        if img.mode != "RGB":
-            img = img.convert("RGB")
+    if shards_dir:
+        # Precompiled memory-mapped shards (see shards.py)
+        from shards import ShardDataset
+        logger.info(f"Loading test shards from {shards_dir}")
+        test_set = ShardDataset(shards_dir, "test", image_processor.image_mean, image_processor.image_std)
+    else:
+        from datasets import load_dataset
+
+        logger.info(f"Loading test set from {DATASET_PATH}")
+        dataset = load_dataset("imagefolder", data_dir=DATASET_PATH)
+        
+        # Use the same split logic as train.py
+        split = dataset["train"].train_test_split(test_size=0.2, seed=42)
+        val_test = split["test"].train_test_split(test_size=0.5, seed=42)
+        test_set = val_test["test"]
+        
+        # Batched preprocessing, applied on the fly as the DataLoader fetches
+        # each batch so images are decoded in the worker processes
+        def preprocess(batch):
+            images = [img.convert("RGB") if img.mode != "RGB" else img for img in batch["image"]]
+            processed = image_processor(images=images, return_tensors="pt")
+            return {"pixel_values": processed["pixel_values"], "label": batch["label"]}
         
-        # Use the image_processor instead of manual transforms
-        # This ensures consistency with the training preprocessing
-        processed = image_processor(images=img, return_tensors="pt")
-        example["pixel_values"] = processed["pixel_values"].squeeze(0)  # Remove batch dimension
-        return example
+        test_set.set_transform(preprocess)
     
-    test_set = test_set.map(preprocess, batched=False)
+    loader = DataLoader(
+        test_set,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        collate_fn=collate
+    )
     
+    # Keep one-off initialisation out of the throughput figure
+    logger.info(f"Warm-up took {warm_up(model, image_processor, (batch_size,)):.2f}s")
+
     # Evaluation
-    correct = 0
-    total = 0
+    all_preds = []
+    all_labels = []
+    start = time.perf_counter()
     
-    for ex in test_set:
-        # Add batch dimension back
-        pixel_values = ex["pixel_values"].unsqueeze(0)
-        
-        with torch.no_grad():
+    with torch.no_grad():
+        for pixel_values, labels in loader:
             outputs = model(pixel_values=pixel_values)
-            pred = torch.argmax(outputs.logits, dim=1).item()
-        
-        if pred == ex["label"]:
-            correct += 1
-        total += 1
+            all_preds.append(torch.argmax(outputs.logits, dim=1).numpy())
+            all_labels.append(labels.numpy())
+    
+    elapsed = time.perf_counter() - start
+    preds = np.concatenate(all_preds) if all_preds else np.array([], dtype=np.int64)
+    labels = np.concatenate(all_labels) if all_labels else np.array([], dtype=np.int64)
     
-    acc = correct / total if total > 0 else 0
-    logger.info(f"Test set accuracy: {acc:.4f} ({correct}/{total})")
-    return acc
+    metrics = compute_classification_metrics(preds, labels, len(model.config.id2label))
+    metrics["images_per_second"] = len(labels) / elapsed if elapsed > 0 else 0.0
+    
+    total = len(labels)
+    correct = int((preds == labels).sum())
+    logger.info(f"Test set accuracy: {metrics['accuracy']:.4f} ({correct}/{total})")
+    for label_id, name in sorted(model.config.id2label.items()):
+        logger.info(
+            f"  {name}: precision={metrics['precision'][int(label_id)]:.4f} "
+            f"recall={metrics['recall'][int(label_id)]:.4f}"
+        )
+    logger.info(f"Confusion matrix (rows=true, cols=pred): {metrics['confusion_matrix']}")
+    logger.info(f"Throughput: {metrics['images_per_second']:.1f} images/s ({elapsed:.2f}s)")
+    return metrics
+
+def compute_classification_metrics(preds, labels, num_classes):
+    """Accuracy, per-class precision/recall and confusion matrix from label arrays"""
+    import numpy as np
+
+    confusion = np.bincount(
+        labels * num_classes + preds, minlength=num_classes * num_classes
+    ).reshape(num_classes, num_classes)
+    true_positives = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    actual = confusion.sum(axis=1)
+    precision = np.divide(true_positives, predicted, out=np.zeros(num_classes), where=predicted > 0)
+    recall = np.divide(true_positives, actual, out=np.zeros(num_classes), where=actual > 0)
+    return {
+        "accuracy": float(true_positives.sum() / max(len(labels), 1)),
+        "precision": precision.tolist(),
+        "recall": recall.tolist(),
+        "confusion_matrix": confusion.tolist(),
+    }
 
 def main():
     """Main function to handle command line arguments"""
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  python test.py <image_path>           - Predict single image")
-        print("  python test.py --dataset              - Evaluate on test dataset")
-        print("  python test.py --help                 - Show this help")
+    parser = argparse.ArgumentParser(
+        description="Waste Classifier Test Script",
+        epilog="Example: python test.py my_waste_image.jpg"
+    )
+    parser.add_argument("image_path", nargs="?", help="Predict single image")
+    parser.add_argument("--dataset", action="store_true", help="Evaluate on test dataset")
+    parser.add_argument("--shards", metavar="DIR", help="Evaluate from tensor shards compiled by shards.py")
+    parser.add_argument("--bulk", metavar="SOURCE",
+                        help="Classify a directory tree, glob pattern or CSV manifest of images")
+    parser.add_argument("--output", default="bulk_predictions.jsonl",
+                        help="Bulk results file (JSONL) or directory (Parquet)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="Bulk output format")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted bulk run from its checkpoint")
+    parser.add_argument("--batch-size", type=int, default=32, help="Evaluation batch size")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for decoding (default: 0 for --dataset, all CPUs for --bulk)")
+    parser.add_argument("--engine", choices=ENGINES, default="torch",
+                        help="Inference engine (ONNX engines need export_onnx.py first)")
+    parser.add_argument("--top-k", type=int, default=1,
+                        help="Also list the k most likely labels for a single image (calibrated probabilities)")
+    parser.add_argument("--model-path", default=MODEL_PATH,
+                        help="Checkpoint to evaluate, e.g. one model registry version (default: waste_classifier/)")
+    args = parser.parse_args()
+
+    if not args.dataset and not args.bulk and not args.image_path:
+        parser.print_help()
         return
-    
-    if sys.argv[1] == "--help":
-        print("Waste Classifier Test Script")
-        print("Usage:")
-        print("  python test.py <image_path>           - Predict single image")
-        print("  python test.py --dataset              - Evaluate on test dataset")
-        print("\nExample:")
-        print("  python test.py my_waste_image.jpg")
+
+    if args.image_path and not os.path.exists(args.image_path):
+        logger.error(f"Image file not found: {args.image_path}")
         return
+
+    load_model_and_processor(args.engine, args.model_path)
+
+    if args.bulk:
+        from bulk_classify import run_bulk
+        logger.info(f"Bulk classifying {args.bulk} -> {args.output}")
+        run_bulk(
+            args.bulk,
+            args.output,
+            model,
+            image_processor,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            output_format=args.format,
+            resume=args.resume,
+            temperature=temperature
+        )
     
-    elif sys.argv[1] == "--dataset":
+    elif args.dataset:
         logger.info("Evaluating on test dataset...")
-        evaluate_on_test()
+        evaluate_on_test(batch_size=args.batch_size, num_workers=args.workers or 0, shards_dir=args.shards)
     
     else:
         # Single image prediction
-        image_path = sys.argv[1]
-        
-        if not os.path.exists(image_path):
-            logger.error(f"Image file not found: {image_path}")
-            return
-        
+        image_path = args.image_path
         logger.info(f"Predicting for image: {image_path}")
-        result = predict_image(image_path, model, image_processor)
+        result = predict_image(image_path, model, image_processor, top_k=args.top_k)
         
         if "error" in result:
             print(f"Error: {result['error']}")
@@ -1,12 +1,14 @@
 import os
-import logging
-from datasets import load_dataset, DatasetDict
-from transformers import AutoImageProcessor, AutoModelForImageClassification, TrainingArguments, Trainer
-from torchvision import transforms
-import torch
-from PIL import Image
-import numpy as np
 import sys
+import json
+import time
+import logging
+import argparse
+
+from labels import ID2LABEL, LABEL2ID
+
+# Heavy libraries (torch, transformers, datasets) are imported where they
+# are used, so `--help` and importing this module stay fast
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO)
@@ -16,233 +18,413 @@ logger = logging.getLogger("waste_classifier_train")
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATASET_PATH = os.path.join(SCRIPT_DIR, "data")
 MODEL_SAVE_PATH = os.path.join(SCRIPT_DIR, "waste_classifier")
+BASE_MODEL = "google/vit-base-patch16-224"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fine-tune the ViT waste classifier")
+    parser.add_argument("--export-onnx", action="store_true",
+                        help="After training, export ONNX and INT8 graphs and check accuracy parity")
+    parser.add_argument("--lazy-preprocessing", action="store_true",
+                        help="Preprocess images on the fly in the DataLoader instead of caching pixel_values up front")
+    parser.add_argument("--dataloader-workers", type=int, default=None,
+                        help="DataLoader worker processes (decode/preprocess in parallel with training)")
+    parser.add_argument("--profile", choices=["default", "fast"], default="default",
+                        help="Training performance profile (fast: bf16 when supported, torch.compile, "
+                             "larger effective batch, parallel data loading)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch intra-op threads (fast profile default: cores not used by DataLoader workers)")
+    parser.add_argument("--shards", metavar="DIR", default=None,
+                        help="Train from tensor shards compiled by shards.py instead of decoding the image folder")
+    parser.add_argument("--output-dir", default=MODEL_SAVE_PATH,
+                        help="Where to save the trained model, e.g. a new version directory for the model "
+                             "registry instead of replacing the served checkpoint (default: waste_classifier/)")
+    return parser.parse_args()
 
-# Print paths for debugging
-logger.info(f"Script directory: {SCRIPT_DIR}")
-logger.info(f"Dataset path: {DATASET_PATH}")
-logger.info(f"Model save path: {MODEL_SAVE_PATH}")
-
-# Check if dataset path exists
-if not os.path.exists(DATASET_PATH):
-    logger.error(f"Dataset path does not exist: {DATASET_PATH}")
-    logger.info("Please ensure your dataset is structured as:")
-    logger.info("  data/")
-    logger.info("    biodegradable/")
-    logger.info("      image1.jpg")
-    logger.info("      image2.jpg")
-    logger.info("    non_biodegradable/")
-    logger.info("      image3.jpg")
-    logger.info("      image4.jpg")
-    sys.exit(1)
-
-LABEL2INFO = {
-    0: {
-        "label": "biodegradable",
-        "description": "Easily breaks down naturally. Good for composting.",
-        "recyclable": False,
-        "disposal": "Use compost or organic bin",
-        "example_items": ["banana peel", "food waste", "paper"],
-        "environmental_benefit": "Composting biodegradable waste returns nutrients to the soil, reduces landfill use, and lowers greenhouse gas emissions.",
-        "protection_tip": "Compost at home or use municipal organic waste bins. Avoid mixing with plastics or hazardous waste.",
-        "poor_disposal_effects": "If disposed of improperly, biodegradable waste can cause methane emissions in landfills and contribute to water pollution and eutrophication."
-    },
-    1: {
-        "label": "non_biodegradable",
-        "description": "Does not break down easily. Should be disposed of carefully.",
-        "recyclable": False,
-        "disposal": "Use general waste bin or recycling if possible",
-        "example_items": ["plastic bag", "styrofoam", "metal can"],
-        "environmental_benefit": "Proper disposal and recycling of non-biodegradable waste reduces pollution, conserves resources, and protects wildlife.",
-        "protection_tip": "Reduce use, reuse items, and recycle whenever possible. Never burn or dump in nature.",
-        "poor_disposal_effects": "Improper disposal leads to soil and water pollution, harms wildlife, and causes long-term environmental damage. Plastics can persist for hundreds of years."
-    }
-}
 
 # --- Dataset loading ---
-logger.info(f"Loading dataset from {DATASET_PATH}")
-try:
+def load_splits(dataset_path):
+    """Load the image folder and split it 80/10/10 with seed 42"""
+    from datasets import load_dataset, DatasetDict
+
+    logger.info(f"Loading dataset from {dataset_path}")
     # Load dataset with O/R folder structure
-    dataset = load_dataset("imagefolder", data_dir=DATASET_PATH)
+    dataset = load_dataset("imagefolder", data_dir=dataset_path)
     logger.info(f"Dataset loaded successfully. Features: {dataset['train'].features}")
     logger.info(f"Number of training examples: {len(dataset['train'])}")
-    
+
     try:
         logger.info(f"Original label names: {dataset['train'].features['label'].names}")
     except KeyError:
         logger.warning("No label feature found")
-        
+
     # Print some sample labels to understand the mapping
     for i in range(min(3, len(dataset['train']))):
         sample = dataset['train'][i]
         logger.info(f"Sample {i}: label={sample['label']}")
-        
-except Exception as e:
-    logger.error(f"Failed to load dataset: {e}")
-    sys.exit(1)
-
-# --- Split train/val/test ---
-logger.info("Splitting dataset (80% train, 10% val, 10% test)")
-split = dataset["train"].train_test_split(test_size=0.2, seed=42)
-val_test = split["test"].train_test_split(test_size=0.5, seed=42)
-dataset = DatasetDict({
-    "train": split["train"],
-    "val": val_test["train"],
-    "test": val_test["test"]
-})
-
-logger.info(f"Train samples: {len(dataset['train'])}")
-logger.info(f"Val samples: {len(dataset['val'])}")
-logger.info(f"Test samples: {len(dataset['test'])}")
+
+    # --- Split train/val/test ---
+    logger.info("Splitting dataset (80% train, 10% val, 10% test)")
+    split = dataset["train"].train_test_split(test_size=0.2, seed=42)
+    val_test = split["test"].train_test_split(test_size=0.5, seed=42)
+    dataset = DatasetDict({
+        "train": split["train"],
+        "val": val_test["train"],
+        "test": val_test["test"]
+    })
+
+    logger.info(f"Train samples: {len(dataset['train'])}")
+    logger.info(f"Val samples: {len(dataset['val'])}")
+    logger.info(f"Test samples: {len(dataset['test'])}")
+    return dataset
+
 
 # --- Preprocessing ---
-logger.info("Setting up transforms and processor")
-image_processor = AutoImageProcessor.from_pretrained("google/vit-base-patch16-224", use_fast=True)
-
-# Updated preprocessing function that's compatible with the trainer
-def transform_images(examples):
-    """Transform a batch of images"""
-    images = [image.convert("RGB") if image.mode != "RGB" else image for image in examples["image"]]
-    # Use the image processor directly instead of manual transforms
-    inputs = image_processor(images, return_tensors="pt")
-    examples["pixel_values"] = inputs["pixel_values"]
-    return examples
-
-# --- Relabel O/R folders to biodegradable/non_biodegradable ---
-def relabel_OR_to_standard(example):
-    """Convert O/R labels to 0/1 (biodegradable/non_biodegradable)"""
-    # The imagefolder loader assigns labels based on alphabetical order
-    # So if your folders are O, R then: O=0, R=1
-    # But we want: O (organic) = 0 (biodegradable), R (recyclable) = 1 (non_biodegradable)
-    
-    # Check current label names
-    original_labels = dataset["train"].features['label'].names
+def prepare_datasets(args, image_processor):
+    """Train/val/test sets yielding pixel_values and 0/1 labels"""
+    if args.shards:
+        # Memory-mapped uint8 shards, already split, relabeled and resized
+        from shards import ShardDataset
+        logger.info(f"Loading precompiled shards from {args.shards}")
+        dataset = {
+            split_name: ShardDataset(args.shards, split_name, image_processor.image_mean, image_processor.image_std)
+            for split_name in ("train", "val", "test")
+        }
+        logger.info(f"Train samples: {len(dataset['train'])}")
+        logger.info(f"Val samples: {len(dataset['val'])}")
+        logger.info(f"Test samples: {len(dataset['test'])}")
+        return dataset
+
+    dataset = load_splits(DATASET_PATH)
+
+    # The imagefolder loader assigns labels in alphabetical folder order,
+    # so O (organic) = 0 (biodegradable) and R (recyclable) = 1
+    # (non_biodegradable) already. Flip them if the folders came out as [R, O].
+    original_labels = dataset["train"].features["label"].names
     logger.info(f"Original folder-based labels: {original_labels}")
-    
-    # If folders are in alphabetical order [O, R], labels are already correct
-    # If folders are [R, O], we need to flip them
-    if original_labels == ['O', 'R']:
-        # O=0 (biodegradable), R=1 (non_biodegradable) - already correct
-        return example
-    elif original_labels == ['R', 'O']:
-        # R=0, O=1 - need to flip
-        example['label'] = 1 - example['label']  # flip 0->1, 1->0
-        return example
-    else:
-        # Labels are already correct or use default mapping
+    flip_labels = original_labels == ['R', 'O']
+
+    def relabel_OR_to_standard(example):
+        """Convert O/R labels to 0/1 (biodegradable/non_biodegradable)"""
+        if flip_labels:
+            example['label'] = 1 - example['label']  # flip 0->1, 1->0
         return example
 
-# Apply relabeling first
-logger.info("Applying O/R to biodegradable/non_biodegradable relabeling...")
-dataset["train"] = dataset["train"].map(relabel_OR_to_standard)
-dataset["val"] = dataset["val"].map(relabel_OR_to_standard)
-dataset["test"] = dataset["test"].map(relabel_OR_to_standard)
+    def transform_images(examples):
+        """Transform a batch of images"""
+        images = [image.convert("RGB") if image.mode != "RGB" else image for image in examples["image"]]
+        inputs = image_processor(images, return_tensors="pt")
+        examples["pixel_values"] = inputs["pixel_values"]
+        return examples
+
+    if args.lazy_preprocessing:
+        # Relabel and preprocess each batch as the DataLoader fetches it, so
+        # nothing is written to the Arrow cache and memory stays flat
+        def lazy_transform(examples):
+            """Relabel and transform a batch of images on the fly"""
+            labels = [1 - label if flip_labels else label for label in examples["label"]]
+            images = [image.convert("RGB") if image.mode != "RGB" else image for image in examples["image"]]
+            inputs = image_processor(images, return_tensors="pt")
+            return {"pixel_values": inputs["pixel_values"], "label": labels}
+
+        logger.info("Using on-the-fly transforms (lazy preprocessing)...")
+        for split_name in ("train", "val", "test"):
+            dataset[split_name].set_transform(lazy_transform)
+        return dataset
 
-# Apply transforms
-logger.info("Applying transforms...")
-dataset["train"] = dataset["train"].map(transform_images, batched=True, batch_size=32)
-dataset["val"] = dataset["val"].map(transform_images, batched=True, batch_size=32)
-dataset["test"] = dataset["test"].map(transform_images, batched=True, batch_size=32)
+    # Apply relabeling first
+    logger.info("Applying O/R to biodegradable/non_biodegradable relabeling...")
+    for split_name in ("train", "val", "test"):
+        dataset[split_name] = dataset[split_name].map(relabel_OR_to_standard)
+
+    # Apply transforms
+    logger.info("Applying transforms...")
+    for split_name in ("train", "val", "test"):
+        dataset[split_name] = dataset[split_name].map(transform_images, batched=True, batch_size=32)
+
+    # Set format for PyTorch
+    for split_name in ("train", "val", "test"):
+        dataset[split_name].set_format("torch", columns=["pixel_values", "label"])
+    return dataset
 
-# Set format for PyTorch
-dataset["train"].set_format("torch", columns=["pixel_values", "label"])
-dataset["val"].set_format("torch", columns=["pixel_values", "label"])
-dataset["test"].set_format("torch", columns=["pixel_values", "label"])
 
-# Updated collate function
 def collate_fn(batch):
+    import torch
+
     pixel_values = torch.stack([item["pixel_values"] for item in batch])
     labels = torch.tensor([item["label"] for item in batch], dtype=torch.long)
     return {"pixel_values": pixel_values, "labels": labels}
 
+
 # --- Model ---
-id2label = {0: "biodegradable", 1: "non_biodegradable"}
-label2id = {v: k for k, v in id2label.items()}
-logger.info("Loading ViT model")
-model = AutoModelForImageClassification.from_pretrained(
-    "google/vit-base-patch16-224",
-    num_labels=2,
-    id2label=id2label,
-    label2id=label2id,
-    ignore_mismatched_sizes=True
-)
-
-# --- Training ---
-logger.info("Setting up Trainer and TrainingArguments")
-training_args = TrainingArguments(
-    output_dir=os.path.join(SCRIPT_DIR, "vit_trainer_output"),
-    per_device_train_batch_size=8,
-    per_device_eval_batch_size=8,
-    eval_strategy="epoch",  # Fixed parameter name
-    save_strategy="epoch",
-    num_train_epochs=3,
-    learning_rate=2e-5,
-    logging_dir=os.path.join(SCRIPT_DIR, "vit_logs"),
-    logging_steps=10,
-    load_best_model_at_end=True,
-    metric_for_best_model="accuracy",
-    save_total_limit=1,
-    report_to=[],
-    dataloader_pin_memory=False,  # Disable pin memory to avoid the warning
-    remove_unused_columns=False,  # Keep all columns
-)
+def load_base_model():
+    from transformers import AutoModelForImageClassification
+
+    logger.info("Loading ViT model")
+    return AutoModelForImageClassification.from_pretrained(
+        BASE_MODEL,
+        num_labels=len(ID2LABEL),
+        id2label=ID2LABEL,
+        label2id=LABEL2ID,
+        ignore_mismatched_sizes=True
+    )
+
+
+# --- Performance profile ---
+def cpu_supports_bf16():
+    import torch
+
+    try:
+        return torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except Exception:
+        return False
+
+
+def training_profiles():
+    import torch
+
+    cpu_count = os.cpu_count() or 1
+    return {
+        "default": {
+            "per_device_train_batch_size": 8,
+            "per_device_eval_batch_size": 8,
+            "gradient_accumulation_steps": 1,
+            "bf16": False,
+            "torch_compile": False,
+            "dataloader_num_workers": 0,
+            "dataloader_pin_memory": False,  # Disable pin memory to avoid the warning
+        },
+        "fast": {
+            "per_device_train_batch_size": 16,
+            "per_device_eval_batch_size": 32,
+            "gradient_accumulation_steps": 2,
+            "bf16": cpu_supports_bf16() or torch.cuda.is_available(),
+            "use_cpu": not torch.cuda.is_available(),  # Required for bf16 autocast on CPU
+            "torch_compile": True,
+            "dataloader_num_workers": min(8, max(1, cpu_count // 4)),
+            "dataloader_pin_memory": torch.cuda.is_available(),
+            "dataloader_persistent_workers": True,
+        },
+    }
+
+
+def resolve_profile(args):
+    """TrainingArguments overrides for the selected profile; also sets torch threads"""
+    import torch
+
+    profile = dict(training_profiles()[args.profile])
+    if args.dataloader_workers is not None:
+        profile["dataloader_num_workers"] = args.dataloader_workers
+    if profile["dataloader_num_workers"] == 0:
+        profile.pop("dataloader_persistent_workers", None)
+
+    num_threads = args.threads
+    if num_threads is None and args.profile == "fast":
+        num_threads = max(1, (os.cpu_count() or 1) - profile["dataloader_num_workers"])
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    logger.info(f"Training profile '{args.profile}': {profile}, torch threads: {torch.get_num_threads()}")
+    return profile
+
+
+def throughput_callback(samples_per_step, report_path, profile_name, profile):
+    """TrainerCallback recording samples/s and step time per epoch to a JSON report"""
+    import torch
+    from transformers import TrainerCallback
+
+    class ThroughputCallback(TrainerCallback):
+        def __init__(self):
+            self.epochs = []
+
+        def on_epoch_begin(self, args, state, control, **kwargs):
+            self.epoch_start = time.perf_counter()
+            self.step_times = []
+
+        def on_step_begin(self, args, state, control, **kwargs):
+            self.step_start = time.perf_counter()
+
+        def on_step_end(self, args, state, control, **kwargs):
+            self.step_times.append(time.perf_counter() - self.step_start)
+
+        def on_epoch_end(self, args, state, control, **kwargs):
+            elapsed = time.perf_counter() - self.epoch_start
+            steps = len(self.step_times)
+            epoch = {
+                "epoch": round(state.epoch or len(self.epochs) + 1, 2),
+                "steps": steps,
+                "seconds": round(elapsed, 2),
+                "samples_per_second": round(steps * samples_per_step / elapsed, 2) if elapsed > 0 else 0.0,
+                "mean_step_seconds": round(sum(self.step_times) / steps, 4) if steps else 0.0,
+            }
+            self.epochs.append(epoch)
+            logger.info(f"Epoch throughput: {epoch}")
+            self.write_report()
+
+        def write_report(self):
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+            with open(report_path, "w") as f:
+                json.dump({
+                    "profile": profile_name,
+                    "settings": profile,
+                    "torch_threads": torch.get_num_threads(),
+                    "epochs": self.epochs,
+                }, f, indent=2)
+
+    return ThroughputCallback()
+
 
 def compute_metrics(eval_pred):
+    import numpy as np
+
     logits, labels = eval_pred
     preds = np.argmax(logits, axis=1)
     acc = (preds == labels).mean()
     return {"accuracy": acc}
 
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=dataset["train"],
-    eval_dataset=dataset["val"],
-    data_collator=collate_fn,
-    compute_metrics=compute_metrics,
-)
-
-logger.info("Starting training...")
-try:
-    trainer.train()
-    logger.info("Training completed successfully!")
-except Exception as e:
-    logger.error(f"Training failed: {e}")
-    sys.exit(1)
 
 # --- Save model and processor ---
-logger.info(f"Saving model to {MODEL_SAVE_PATH}")
-try:
-    # Create directory if it doesn't exist
-    os.makedirs(MODEL_SAVE_PATH, exist_ok=True)
-    
-    model.save_pretrained(MODEL_SAVE_PATH)
-    image_processor.save_pretrained(MODEL_SAVE_PATH)
-    
+def save_model(model, image_processor, save_path):
+    logger.info(f"Saving model to {save_path}")
+    os.makedirs(save_path, exist_ok=True)
+
+    model.save_pretrained(save_path)
+    image_processor.save_pretrained(save_path)
+
     # Verify files were saved
     required_files = ["config.json", "pytorch_model.bin", "preprocessor_config.json"]
-    missing_files = []
-    for file in required_files:
-        if not os.path.exists(os.path.join(MODEL_SAVE_PATH, file)):
-            missing_files.append(file)
-    
+    missing_files = [file for file in required_files if not os.path.exists(os.path.join(save_path, file))]
+
     if missing_files:
         logger.warning(f"Some expected files are missing: {missing_files}")
     else:
         logger.info("All model files saved successfully!")
-    
-    logger.info(f"Model saved to: {os.path.abspath(MODEL_SAVE_PATH)}")
+
+    logger.info(f"Model saved to: {os.path.abspath(save_path)}")
     logger.info("Training complete and model saved.")
-    
-except Exception as e:
-    logger.error(f"Failed to save model: {e}")
-    sys.exit(1)
-
-# --- Test the saved model ---
-logger.info("Testing saved model...")
-try:
+
+
+def verify_saved_model(save_path):
     from transformers import AutoModelForImageClassification, AutoImageProcessor
-    test_model = AutoModelForImageClassification.from_pretrained(MODEL_SAVE_PATH, local_files_only=True)
-    test_processor = AutoImageProcessor.from_pretrained(MODEL_SAVE_PATH, local_files_only=True)
-    logger.info("✅ Model can be loaded successfully!")
-except Exception as e:
-    logger.error(f"❌ Failed to load saved model: {e}")
\ No newline at end of file
+
+    logger.info("Testing saved model...")
+    try:
+        AutoModelForImageClassification.from_pretrained(save_path, local_files_only=True)
+        AutoImageProcessor.from_pretrained(save_path, local_files_only=True)
+        logger.info("✅ Model can be loaded successfully!")
+    except Exception as e:
+        logger.error(f"❌ Failed to load saved model: {e}")
+
+
+def calibrate_saved_model(trainer, val_set, save_path):
+    """Fit the softmax temperature on the validation split and save calibration.json"""
+    from calibrate import fit_and_save
+
+    try:
+        output = trainer.predict(val_set)
+        fit_and_save(save_path, output.predictions, output.label_ids)
+    except Exception as e:
+        logger.error(f"Calibration failed, probabilities stay uncalibrated: {e}")
+
+
+def main():
+    args = parse_args()
+    startup_start = time.perf_counter()
+
+    # Print paths for debugging
+    logger.info(f"Script directory: {SCRIPT_DIR}")
+    logger.info(f"Dataset path: {DATASET_PATH}")
+    logger.info(f"Model save path: {args.output_dir}")
+
+    # Check if dataset path exists
+    if not args.shards and not os.path.exists(DATASET_PATH):
+        logger.error(f"Dataset path does not exist: {DATASET_PATH}")
+        logger.info("Please ensure your dataset is structured as:")
+        logger.info("  data/")
+        logger.info("    biodegradable/")
+        logger.info("      image1.jpg")
+        logger.info("      image2.jpg")
+        logger.info("    non_biodegradable/")
+        logger.info("      image3.jpg")
+        logger.info("      image4.jpg")
+        return 1
+
+    from transformers import AutoImageProcessor, TrainingArguments, Trainer
+
+    logger.info("Setting up transforms and processor")
+    image_processor = AutoImageProcessor.from_pretrained(BASE_MODEL, use_fast=True)
+
+    try:
+        dataset = prepare_datasets(args, image_processor)
+    except Exception as e:
+        logger.error(f"Failed to load dataset: {e}")
+        return 1
+
+    model = load_base_model()
+    profile = resolve_profile(args)
+
+    # --- Training ---
+    logger.info("Setting up Trainer and TrainingArguments")
+    training_args = TrainingArguments(
+        output_dir=os.path.join(SCRIPT_DIR, "vit_trainer_output"),
+        eval_strategy="epoch",  # Fixed parameter name
+        save_strategy="epoch",
+        num_train_epochs=3,
+        learning_rate=2e-5,
+        logging_dir=os.path.join(SCRIPT_DIR, "vit_logs"),
+        logging_steps=10,
+        load_best_model_at_end=True,
+        metric_for_best_model="accuracy",
+        save_total_limit=1,
+        report_to=[],
+        remove_unused_columns=False,  # Keep all columns
+        **profile,
+    )
+
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=dataset["train"],
+        eval_dataset=dataset["val"],
+        data_collator=collate_fn,
+        compute_metrics=compute_metrics,
+        callbacks=[throughput_callback(
+            samples_per_step=training_args.train_batch_size * training_args.gradient_accumulation_steps,
+            report_path=os.path.join(training_args.output_dir, f"throughput_{args.profile}.json"),
+            profile_name=args.profile,
+            profile=profile,
+        )],
+    )
+    logger.info(f"Startup (imports, data preparation, model load) took {time.perf_counter() - startup_start:.1f}s")
+
+    logger.info("Starting training...")
+    try:
+        trainer.train()
+        logger.info("Training completed successfully!")
+    except Exception as e:
+        logger.error(f"Training failed: {e}")
+        return 1
+
+    try:
+        save_model(model, image_processor, args.output_dir)
+    except Exception as e:
+        logger.error(f"Failed to save model: {e}")
+        return 1
+
+    verify_saved_model(args.output_dir)
+
+    # --- Calibrate probabilities on the validation split ---
+    calibrate_saved_model(trainer, dataset["val"], args.output_dir)
+
+    # --- Export ONNX / INT8 ---
+    if args.export_onnx:
+        logger.info("Exporting ONNX and INT8 models...")
+        try:
+            from export_onnx import export_onnx, check_parity
+            export_onnx(args.output_dir)
+            check_parity(args.output_dir)
+        except Exception as e:
+            logger.error(f"ONNX export failed: {e}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
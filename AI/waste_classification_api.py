@@ -1,16 +1,77 @@
 import os
+import hmac
+import time
+import heapq
+import logging
+import shutil
+import zipfile
+import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify, g
+
+from admission import AdmissionQueue, RateLimiter, Rejected
+from image_preprocessing import ImageRejected, MemoryBudget, as_file, encode_jpeg, load_image
+from labels import label_info
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from model_registry import ModelRegistry
+from resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged_call
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waste_classification_api")
+
+# Startup timings reported by /ready and /metrics
+IMPORT_START = time.perf_counter()
 
 # ===============================
 # Configuration
 # ===============================
 
-HF_API_URL = "https://api-inference.huggingface.co/models/Claudineuwa/waste_classifier_Isaac"
+HF_MODEL_ID = os.environ.get("HF_MODEL_ID", "Claudineuwa/waste_classifier_Isaac")
+HF_API_URL = os.environ.get(
+    "HF_API_URL",
+    f"https://api-inference.huggingface.co/models/{HF_MODEL_ID}"
+)
+
+MODEL_PATH = os.environ.get(
+    "MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "waste_classifier")
+)
+
+# "remote" (the default) calls the Hugging Face Inference API, "local"
+# runs the train.py checkpoint in-process. Local inference is opt-in: a
+# checkpoint left in MODEL_PATH does not switch a deployment over.
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "remote")
+if INFERENCE_MODE not in ("local", "remote"):
+    raise RuntimeError(f"Unknown INFERENCE_MODE: {INFERENCE_MODE}")
+
+# Local inference engine: "torch", "onnx" or "onnx-int8" (see export_onnx.py)
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "torch")
+
+# Model registry: a JSON file of model versions and the traffic split
+# between them (see model_registry.py), re-read when it changes. Without
+# it one version is served, set by the INFERENCE_MODE / MODEL_PATH /
+# HF_API_URL settings. ADMIN_TOKEN enables the /admin/models endpoint.
+MODEL_REGISTRY_PATH = os.environ.get("MODEL_REGISTRY_PATH")
+MODEL_REGISTRY_POLL_SECONDS = float(os.environ.get("MODEL_REGISTRY_POLL_SECONDS", 5))
+MODEL_RETIRE_SECONDS = float(os.environ.get("MODEL_RETIRE_SECONDS", 60))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Micro-batching of concurrent local inference requests
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 10))
+LOCAL_INFERENCE_TIMEOUT = float(os.environ.get("LOCAL_INFERENCE_TIMEOUT", 30))
+
+# Prediction cache for resubmitted images (size 0 disables it). Set
+# PREDICTION_CACHE_PATH to a SQLite file to share hits between workers.
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 1024))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+PREDICTION_CACHE_PATH = os.environ.get("PREDICTION_CACHE_PATH")
 
 HF_API_TOKEN = os.environ.get("HF_API_TOKEN")
-if not HF_API_TOKEN:
+if INFERENCE_MODE == "remote" and not HF_API_TOKEN and not MODEL_REGISTRY_PATH:
     raise RuntimeError("HF_API_TOKEN environment variable is not set")
 
 HF_HEADERS = {
@@ -22,48 +83,886 @@ BACKEND_URL = os.environ.get(
     "https://green-iq-backend-xsui.onrender.com/wasteSubmission"
 )
 
+# "sync" waits for the backend POST before responding; "queued" responds
+# right away and hands the submission to a durable local queue
+BACKEND_SUBMIT_MODE = os.environ.get("BACKEND_SUBMIT_MODE", "sync")
+if BACKEND_SUBMIT_MODE not in ("sync", "queued"):
+    raise RuntimeError(f"Unknown BACKEND_SUBMIT_MODE: {BACKEND_SUBMIT_MODE}")
+SUBMISSION_QUEUE_PATH = os.environ.get(
+    "SUBMISSION_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "submissions.sqlite")
+)
+SUBMISSION_WORKERS = int(os.environ.get("SUBMISSION_WORKERS", 4))
+SUBMISSION_BATCH_SIZE = int(os.environ.get("SUBMISSION_BATCH_SIZE", 20))
+SUBMISSION_MAX_ATTEMPTS = int(os.environ.get("SUBMISSION_MAX_ATTEMPTS", 8))
+# Dead-lettered submissions are purged after this long
+SUBMISSION_DEAD_RETENTION_SECONDS = float(os.environ.get("SUBMISSION_DEAD_RETENTION_SECONDS", 7 * 24 * 3600))
+# Callers' Authorization headers are never written to the queue database.
+# Submissions left behind by a stopped process are sent with this token
+# instead, or dead-lettered when it is not set.
+BACKEND_SERVICE_TOKEN = os.environ.get("BACKEND_SERVICE_TOKEN")
+
+# /predict_batch accepts many files (field "images") or a zip ("archive").
+# Each classification is submitted to BACKEND_URL like a /predict one;
+# set BACKEND_BATCH_URL to a backend endpoint that accepts them all in one
+# aggregated submission instead
+MAX_BATCH_IMAGES = int(os.environ.get("MAX_BATCH_IMAGES", 64))
+MAX_ARCHIVE_BYTES = int(os.environ.get("MAX_ARCHIVE_BYTES", 200 * 1024 * 1024))
+BACKEND_BATCH_URL = os.environ.get("BACKEND_BATCH_URL")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+
+# Upload limits and the decode/downscale stage ahead of the model. Images
+# are decoded at reduced resolution and shrunk to PREPROCESS_MAX_SIDE;
+# with PREPROCESS_REMOTE the downscaled JPEG is what goes to Hugging Face
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 15 * 1024 * 1024))
+MAX_BATCH_UPLOAD_BYTES = int(os.environ.get("MAX_BATCH_UPLOAD_BYTES", 200 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 40_000_000))
+PREPROCESS_MAX_SIDE = int(os.environ.get("PREPROCESS_MAX_SIDE", 384))
+PREPROCESS_REMOTE = os.environ.get("PREPROCESS_REMOTE", "1") == "1"
+
+# Uploads are spooled to a temporary file beyond UPLOAD_SPOOL_BYTES and read
+# from there rather than copied into memory. Decode buffers are reserved
+# from a per-process budget: one image may use REQUEST_MEMORY_BYTES, all
+# concurrent decodes together MEMORY_BUDGET_BYTES, and a request waits up
+# to MEMORY_BUDGET_WAIT_SECONDS for room before it is turned away
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+REQUEST_MEMORY_BYTES = int(os.environ.get("REQUEST_MEMORY_BYTES", 256 * 1024 * 1024))
+MEMORY_BUDGET_BYTES = int(os.environ.get("MEMORY_BUDGET_BYTES", 512 * 1024 * 1024))
+MEMORY_BUDGET_WAIT_SECONDS = float(os.environ.get("MEMORY_BUDGET_WAIT_SECONDS", 10))
+
+# Admission control for /predict and /predict_batch; every other route
+# (/health, /ready, /metrics, ...) is a priority lane that bypasses it.
+# Each client (Authorization header, else address) gets a token bucket of
+# RATE_LIMIT_BURST requests refilled at RATE_LIMIT_PER_SECOND (0 = no
+# limit); over it requests get a 429. At most ADMISSION_MAX_ACTIVE
+# requests are handled at once and ADMISSION_QUEUE_SIZE more wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds; the rest get a 503 immediately.
+# Limits apply per worker process.
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", 0))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", max(1.0, 2 * RATE_LIMIT_PER_SECOND)))
+ADMISSION_MAX_ACTIVE = int(os.environ.get("ADMISSION_MAX_ACTIVE", 16))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 32))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5))
+ADMITTED_ENDPOINTS = ("predict", "predict_batch")
+
+# Ranked labels a client may ask for with ?top_k= (scores of local models
+# are temperature-calibrated, see calibrate.py)
+MAX_TOP_K = int(os.environ.get("MAX_TOP_K", 5))
+
+# Dummy batch sizes run through the local model before /ready reports ready
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.environ.get("WARMUP_BATCH_SIZES", f"1,{BATCH_MAX_SIZE}").split(",") if size
+]
+
+# Keep-alive connections kept open per upstream
+UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", 32))
+HF_TIMEOUT = float(os.environ.get("HF_TIMEOUT", 30))
+
+# Circuit breakers: after BREAKER_FAILURE_THRESHOLD consecutive failures an
+# upstream is skipped for BREAKER_RECOVERY_SECONDS instead of tying up a
+# worker on every request until the timeout
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RECOVERY_SECONDS = float(os.environ.get("BREAKER_RECOVERY_SECONDS", 30))
+
+# Hedged Hugging Face requests: a duplicate request is sent when the first
+# has not answered within the recent HEDGE_PERCENTILE latency
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 0.95))
+HEDGE_MIN_DELAY_MS = float(os.environ.get("HEDGE_MIN_DELAY_MS", 50))
+
+# In remote mode, also load the local checkpoint and answer from it when
+# Hugging Face fails or its circuit is open
+LOCAL_FALLBACK = os.environ.get("LOCAL_FALLBACK", "0") == "1"
+
+# ===============================
+# Metrics
+# ===============================
+
+metrics_registry = Registry()
+REQUESTS = metrics_registry.counter(
+    "waste_api_requests_total", "HTTP requests by endpoint and status", ["endpoint", "status"]
+)
+REQUEST_LATENCY = metrics_registry.histogram(
+    "waste_api_request_seconds", "End-to-end request latency", ["endpoint"]
+)
+STAGE_LATENCY = metrics_registry.histogram(
+    "waste_api_stage_seconds", "Latency of each prediction stage", ["endpoint", "stage"]
+)
+IN_FLIGHT = metrics_registry.gauge(
+    "waste_api_in_flight_requests", "Requests currently being handled", ["endpoint"]
+)
+UPSTREAM_RESPONSES = metrics_registry.counter(
+    "waste_api_upstream_responses_total", "Upstream responses by status code", ["upstream", "status"]
+)
+UPSTREAM_LATENCY = metrics_registry.histogram(
+    "waste_api_upstream_seconds", "Upstream request latency", ["upstream"]
+)
+HEDGES = metrics_registry.counter(
+    "waste_api_hedged_requests_total", "Duplicate Hugging Face requests sent after the hedge delay"
+)
+SHED = metrics_registry.counter(
+    "waste_api_shed_requests_total", "Requests rejected by admission control", ["endpoint", "reason"]
+)
+FALLBACKS = metrics_registry.counter(
+    "waste_api_fallbacks_total", "Predictions served by the local model after a remote failure", ["reason"]
+)
+# Per model version, to compare versions sharing traffic
+MODEL_LATENCY = metrics_registry.histogram(
+    "waste_api_model_inference_seconds", "Inference latency by model version", ["version"]
+)
+MODEL_CONFIDENCE = metrics_registry.histogram(
+    "waste_api_model_confidence", "Top-prediction confidence by model version", ["version"],
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0)
+)
+MODEL_PREDICTIONS = metrics_registry.counter(
+    "waste_api_model_predictions_total", "Predictions by model version and label", ["version", "label"]
+)
+
+# ===============================
+# Upstream HTTP Sessions
+# ===============================
+
+def make_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=UPSTREAM_POOL_SIZE
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Separate pools so a slow backend cannot starve inference connections
+hf_session = make_session()
+backend_session = make_session()
+
+breakers = {
+    upstream: CircuitBreaker(upstream, BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_SECONDS)
+    for upstream in ("huggingface", "backend")
+}
+
+def is_upstream_failure(status_code):
+    """Responses that count against an upstream's circuit breaker"""
+    return status_code >= 500 or status_code == 429
+
+def upstream_post(upstream, session, url, **kwargs):
+    """POST to an upstream through its circuit breaker, recording latency and status code"""
+    breaker = breakers[upstream]
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        UPSTREAM_RESPONSES.inc(upstream=upstream, status="circuit_open")
+        raise
+
+    start = time.perf_counter()
+    try:
+        response = session.post(url, **kwargs)
+    except Exception:
+        breaker.record_failure()
+        UPSTREAM_RESPONSES.inc(upstream=upstream, status="error")
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream=upstream)
+
+    if is_upstream_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    UPSTREAM_RESPONSES.inc(upstream=upstream, status=response.status_code)
+    return response
+
+# ===============================
+# Inference Backend
+# ===============================
+
+class InferenceError(Exception):
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details
+
+class LocalInferenceTimeout(Exception):
+    """The local model did not get to an image within LOCAL_INFERENCE_TIMEOUT; answered with a 503"""
+
+    def __init__(self, retry_after=1.0):
+        super().__init__("Local model is overloaded, retry shortly")
+        self.retry_after = retry_after
+
+# Upstream failures that the local fallback model can answer for
+REMOTE_ERRORS = (InferenceError, CircuitOpenError, requests.RequestException)
+
+LOCAL_MODEL_VERSION = os.path.basename(os.path.normpath(MODEL_PATH))
+
+def default_registry_config():
+    """Registry configuration equivalent to INFERENCE_MODE, MODEL_PATH and LOCAL_FALLBACK"""
+    local = {"path": MODEL_PATH, "engine": INFERENCE_ENGINE}
+    if INFERENCE_MODE == "local":
+        return {"versions": {LOCAL_MODEL_VERSION: local}}
+    config = remote_registry_config()
+    if LOCAL_FALLBACK:
+        # Loaded to answer when Hugging Face fails, but sent no traffic
+        config["versions"][LOCAL_MODEL_VERSION] = local
+        config["fallback"] = LOCAL_MODEL_VERSION
+    return config
+
+def remote_registry_config():
+    return {"versions": {HF_MODEL_ID: {"url": HF_API_URL}}}
+
+model_registry = ModelRegistry(BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, retire_after=MODEL_RETIRE_SECONDS)
+startup_timings = {}
+load_start = time.perf_counter()
+if MODEL_REGISTRY_PATH:
+    model_registry.load_file(MODEL_REGISTRY_PATH)
+else:
+    try:
+        model_registry.apply(default_registry_config())
+    except Exception as e:
+        if INFERENCE_MODE == "remote":
+            logger.error(f"Failed to load fallback model, continuing without it: {e}")
+        elif not HF_API_TOKEN:
+            raise
+        else:
+            logger.error(f"Failed to load local model, falling back to remote inference: {e}")
+            INFERENCE_MODE = "remote"
+        model_registry.apply(remote_registry_config())
+startup_timings["model_load_seconds"] = round(time.perf_counter() - load_start, 3)
+logger.info(
+    f"Serving {model_registry.default.name} by default "
+    f"({'model registry ' + MODEL_REGISTRY_PATH if MODEL_REGISTRY_PATH else 'INFERENCE_MODE=' + INFERENCE_MODE})"
+)
+
+# Relative checkpoint paths sent to /admin/models resolve against this
+REGISTRY_BASE_DIR = os.path.dirname(os.path.abspath(MODEL_REGISTRY_PATH or __file__))
+
+def fallback_available():
+    return model_registry.fallback is not None
+
+def choose_model_version(headers):
+    """Registry version for a request.
+
+    An X-Model-Version header pins a version (KeyError if it is unknown).
+    Otherwise the traffic split decides, keyed on the Authorization header
+    so a client keeps seeing the same version.
+    """
+    return model_registry.choose(
+        routing_key=headers.get("Authorization"),
+        pinned=headers.get("X-Model-Version")
+    )
+
+decode_budget = MemoryBudget(MEMORY_BUDGET_BYTES, REQUEST_MEMORY_BYTES, MEMORY_BUDGET_WAIT_SECONDS)
+
+def decode_image(upload):
+    """Decode an upload (bytes or a spooled file) within the memory budget"""
+    return load_image(upload, max_side=PREPROCESS_MAX_SIDE, max_pixels=MAX_IMAGE_PIXELS, budget=decode_budget)
+
+def upload_size(upload):
+    if isinstance(upload, (bytes, bytearray)):
+        return len(upload)
+    upload.seek(0, os.SEEK_END)
+    size = upload.tell()
+    upload.seek(0)
+    return size
+
+def prepare_upstream_image(upload):
+    """Body to forward to Hugging Face for an upload.
+
+    Normally the downscaled JPEG. Without PREPROCESS_REMOTE, small uploads
+    are sent as bytes and spooled ones as the file itself, which requests
+    streams from disk instead of loading into memory.
+    """
+    if PREPROCESS_REMOTE:
+        return encode_jpeg(decode_image(upload))
+    if isinstance(upload, (bytes, bytearray)):
+        return upload
+    if upload_size(upload) <= UPLOAD_SPOOL_BYTES:
+        return upload.read()
+    return as_file(upload)
+
+# Recent Hugging Face latencies, used to pick the hedge delay
+hf_latency = LatencyTracker()
+
+# Runs hedged Hugging Face requests so the request thread can race two
+hedge_pool = ThreadPoolExecutor(max_workers=UPSTREAM_POOL_SIZE)
+
+def hedge_delay():
+    """Seconds to wait before hedging, or None to send a single request"""
+    if not HEDGE_REQUESTS:
+        return None
+    latency = hf_latency.percentile(HEDGE_PERCENTILE)
+    if latency is None:
+        return None
+    return max(latency, HEDGE_MIN_DELAY_MS / 1000.0)
+
+def post_to_hf(url, body):
+    # The raw image as the request body, which a file can be streamed into
+    start = time.perf_counter()
+    hf_response = upstream_post(
+        "huggingface",
+        hf_session,
+        url,
+        headers=HF_HEADERS,
+        data=body,
+        timeout=HF_TIMEOUT
+    )
+
+    if hf_response.status_code != 200:
+        raise InferenceError("Hugging Face inference failed", hf_response.text)
+
+    hf_latency.observe(time.perf_counter() - start)
+    return hf_response.json()
+
+def remote_predict(upload, version):
+    body = prepare_upstream_image(upload)
+    # A streamed file cannot be read by two requests at once, so only bytes are hedged
+    delay = hedge_delay() if isinstance(body, bytes) else None
+    if delay is None:
+        return post_to_hf(version.url, body)
+    return hedged_call(hedge_pool, delay, post_to_hf, version.url, body, on_hedge=HEDGES.inc)
+
+def local_predict(upload, version):
+    # Decode in the request thread, batch only the forward pass
+    image = decode_image(upload)
+    return local_result(version.batcher.submit(image))
+
+def local_result(future):
+    """Wait for a batcher future. On timeout it is cancelled, so the batcher
+    skips the image instead of running it for a caller that has gone."""
+    try:
+        return future.result(timeout=LOCAL_INFERENCE_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise LocalInferenceTimeout() from None
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    from prediction_cache import PredictionCache
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_seconds=PREDICTION_CACHE_TTL,
+        shared_path=PREDICTION_CACHE_PATH
+    )
+
+def cached_inference(upload, version):
+    if prediction_cache is None:
+        return run_inference(upload, version)
+
+    key = prediction_cache.key_for(upload, namespace=version.cache_namespace)
+    predictions = prediction_cache.get(key)
+    if predictions is None:
+        predictions = run_inference(upload, version)
+        if isinstance(predictions, list) and predictions:
+            prediction_cache.set(key, predictions)
+    return predictions
+
+def run_inference(upload, version):
+    if version.is_local:
+        return local_predict(upload, version)
+    return remote_predict(upload, version)
+
+def observe_prediction(model_version, seconds, predictions):
+    """Per-version latency, confidence and label counts, for comparing versions"""
+    MODEL_LATENCY.observe(seconds, version=model_version)
+    if isinstance(predictions, list) and predictions:
+        top_prediction = max(predictions, key=lambda x: x["score"])
+        MODEL_CONFIDENCE.observe(float(top_prediction["score"]), version=model_version)
+        MODEL_PREDICTIONS.inc(version=model_version, label=top_prediction["label"])
+
+def parse_top_k(value):
+    """Number of ranked labels requested (default 1); ValueError if out of range"""
+    if value is None or value == "":
+        return 1
+    try:
+        top_k = int(value)
+    except ValueError:
+        raise ValueError("top_k must be an integer") from None
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}")
+    return top_k
+
+def rank_predictions(predictions, top_k):
+    """The top_k labels, best first, in the response format"""
+    return [
+        {"label": prediction["label"], "confidence": f"{float(prediction['score']):.4f}"}
+        for prediction in heapq.nlargest(top_k, predictions, key=lambda x: x["score"])
+    ]
+
+def predict_image(upload, version):
+    """Cached inference with a registry version, answered by the fallback if it is remote and fails.
+
+    `upload` is the image as bytes or a seekable file such as the spooled
+    upload stream.
+
+    Returns (predictions, model_version, inference source). Fallback
+    predictions are not cached, so the remote result replaces them once
+    Hugging Face recovers.
+    """
+    start = time.perf_counter()
+    try:
+        result = cached_inference(upload, version), version.name, version.source
+    except REMOTE_ERRORS as e:
+        fallback = model_registry.fallback_for(version)
+        if fallback is None:
+            raise
+        logger.warning(f"Remote inference failed, using local model: {e}")
+        FALLBACKS.inc(reason=type(e).__name__)
+        result = local_predict(upload, fallback), fallback.name, "local-fallback"
+    observe_prediction(result[1], time.perf_counter() - start, result[0])
+    return result
+
+def batch_inference(image_blobs, version):
+    """Run inference for many images at once with one registry version.
+
+    Returns one (outcome, model_version, inference source) tuple per image,
+    where outcome is the predictions list or the exception raised for it.
+    """
+    results = [None] * len(image_blobs)
+    keys = [None] * len(image_blobs)
+    sources = [(version.name, version.source)] * len(image_blobs)
+    pending = []
+
+    for i, upload in enumerate(image_blobs):
+        if prediction_cache is not None:
+            keys[i] = prediction_cache.key_for(upload, namespace=version.cache_namespace)
+            results[i] = prediction_cache.get(keys[i])
+        if results[i] is None:
+            pending.append(i)
+
+    def run_local(indices, local_version):
+        # Decode everything first, then submit together so the batcher
+        # can fill whole batches
+        decoded = {}
+        for i in indices:
+            try:
+                decoded[i] = decode_image(image_blobs[i])
+            except Exception as e:
+                results[i] = e
+        futures = {i: local_version.batcher.submit(image) for i, image in decoded.items()}
+        for i, future in futures.items():
+            try:
+                results[i] = local_result(future)
+            except Exception as e:
+                results[i] = e
+
+    fallback = []
+    if version.is_local:
+        run_local(pending, version)
+    else:
+        fallback_version = model_registry.fallback_for(version)
+        def safe_remote_predict(i):
+            try:
+                return remote_predict(image_blobs[i], version)
+            except Exception as e:
+                return e
+        for i, result in zip(pending, remote_pool.map(safe_remote_predict, pending)):
+            results[i] = result
+            if isinstance(result, REMOTE_ERRORS) and fallback_version is not None:
+                fallback.append(i)
+
+        if fallback:
+            logger.warning(f"Remote inference failed for {len(fallback)} images, using local model")
+            FALLBACKS.inc(len(fallback), reason="batch")
+            run_local(fallback, fallback_version)
+            for i in fallback:
+                sources[i] = (fallback_version.name, "local-fallback")
+
+    if prediction_cache is not None:
+        fallback = set(fallback)
+        for i in pending:
+            if i not in fallback and isinstance(results[i], list) and results[i]:
+                prediction_cache.set(keys[i], results[i])
+
+    return [(result, *source) for result, source in zip(results, sources)]
+
+# Concurrent Hugging Face calls for /predict_batch
+remote_pool = ThreadPoolExecutor(max_workers=8)
+
+# ===============================
+# Warm-up and Readiness
+# ===============================
+
+model_ready = threading.Event()
+warmup_error = None
+_warmup_pid = None
+_warmup_lock = threading.Lock()
+
+def start_warm_up():
+    """Warm the local models in the background, once per process.
+
+    Runs in each worker rather than at import: a multi-threaded forward
+    pass in a preloading master leaves forked workers hanging in torch's
+    thread pool. Called before serving, from the server's post_fork hook
+    and on every request (a no-op after the first). Also starts watching
+    MODEL_REGISTRY_PATH, since versions loaded later are warmed in-process.
+    """
+    global _warmup_pid, model_ready
+    pid = os.getpid()
+    if _warmup_pid == pid:
+        return
+    with _warmup_lock:
+        if _warmup_pid == pid:
+            return
+        model_ready = threading.Event()
+        _warmup_pid = pid
+        if MODEL_REGISTRY_PATH:
+            model_registry.watch(MODEL_REGISTRY_PATH, MODEL_REGISTRY_POLL_SECONDS, warm=warm_version)
+        local_versions = [version for version in model_registry.versions() if version.is_local]
+        if not local_versions:
+            model_ready.set()
+        else:
+            threading.Thread(target=warm_up, args=(model_ready, local_versions), daemon=True).start()
+
+def warm_version(version):
+    seconds = version.classifier.warm_up(WARMUP_BATCH_SIZES)
+    logger.info(f"Model {version.name} warm after {seconds:.2f}s (batch sizes {WARMUP_BATCH_SIZES})")
+    return seconds
+
+def warm_up(ready, versions):
+    global warmup_error
+    try:
+        seconds = sum(warm_version(version) for version in versions)
+    except Exception as e:
+        warmup_error = str(e)
+        logger.error(f"Model warm-up failed: {e}")
+        return
+    startup_timings["warmup_seconds"] = round(seconds, 3)
+    startup_timings["ready_seconds"] = round(time.perf_counter() - IMPORT_START, 3)
+    ready.set()
+
+startup_timings["import_seconds"] = round(time.perf_counter() - IMPORT_START, 3)
+
+# ===============================
+# Backend Submission
+# ===============================
+
+def send_to_backend(url, payload, headers):
+    backend_response = upstream_post(
+        "backend",
+        backend_session,
+        url,
+        json=payload,
+        headers={"Content-Type": "application/json", **headers},
+        timeout=10
+    )
+    return backend_response.status_code
+
+submission_queue = None
+if BACKEND_SUBMIT_MODE == "queued":
+    from submission_queue import SubmissionQueue
+    submission_queue = SubmissionQueue(
+        SUBMISSION_QUEUE_PATH,
+        send_to_backend,
+        workers=SUBMISSION_WORKERS,
+        batch_size=SUBMISSION_BATCH_SIZE,
+        max_attempts=SUBMISSION_MAX_ATTEMPTS,
+        fallback_headers={"Authorization": f"Bearer {BACKEND_SERVICE_TOKEN}"} if BACKEND_SERVICE_TOKEN else None,
+        dead_retention=SUBMISSION_DEAD_RETENTION_SECONDS
+    )
+
 # ===============================
 # Flask App
 # ===============================
 
+class SpooledRequest(Request):
+    """Keeps file uploads in memory up to UPLOAD_SPOOL_BYTES, then on disk"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+
 app = Flask(__name__)
+app.request_class = SpooledRequest
+# Hard cap on any request body; per-route limits are checked in the views
+app.config["MAX_CONTENT_LENGTH"] = max(MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES)
 
 # ===============================
 # Root Route
 # ===============================
 
-@app.route("/", methods=["GET"])
-def home():
-    return jsonify({
-        "message": "Waste Classification API is running",
-        "inference_mode": "Hugging Face Inference API (remote)",
-        "model": "Claudineuwa/waste_classifier_Isaac",
+def server_status(message="Waste Classification API is running"):
+    """Body of the root route, shared by both apps"""
+    default = model_registry.default
+    return {
+        "message": message,
+        "inference_mode": (
+            "Local checkpoint (in-process)"
+            if default.is_local
+            else "Hugging Face Inference API (remote)"
+        ),
+        "model": default.name,
+        "traffic": model_traffic(),
         "backend_url": BACKEND_URL,
         "routes": {
             "GET /": "Server status",
             "GET /health": "Health check",
-            "POST /predict": "Image classification"
+            "GET /ready": "Readiness probe (model loaded and warm)",
+            "GET /metrics": "Prometheus metrics",
+            "POST /predict": "Image classification",
+            "POST /predict_batch": "Batch image classification",
+            "GET|PUT /admin/models": "Model registry (requires ADMIN_TOKEN)"
         }
-    })
+    }
+
+@app.route("/", methods=["GET"])
+def home():
+    return jsonify(server_status())
+
+def model_traffic():
+    """{version: share of traffic} for the current registry configuration"""
+    return {name: stats["traffic"] for name, stats in model_registry.stats()["versions"].items()}
 
 # ===============================
 # Health Check
 # ===============================
 
+def health_status(**extra):
+    """Body of the health check, shared by both apps; `extra` adds server-specific fields"""
+    circuit_breakers = {name: breaker.stats() for name, breaker in breakers.items()}
+    degraded = any(stats["state"] != "closed" for stats in circuit_breakers.values())
+    default = model_registry.default
+    status = {
+        "status": "degraded" if degraded else "healthy",
+        "model": "local" if default.is_local else "remote (huggingface)",
+        "engine": default.engine if default.is_local else None,
+        "models": model_registry.stats(),
+        **extra,
+        "local_fallback": fallback_available(),
+        "hedging": HEDGE_REQUESTS,
+        "circuit_breakers": circuit_breakers,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if prediction_cache is not None:
+        status["cache"] = prediction_cache.stats()
+    if submission_queue is not None:
+        status["submission_queue"] = submission_queue.stats()
+    status["memory_budget"] = decode_budget.stats()
+    status["admission"] = admission_stats()
+    return status
+
 @app.route("/health", methods=["GET"])
 def health():
+    return jsonify(health_status())
+
+# ===============================
+# Readiness Probe
+# ===============================
+
+def readiness():
+    """(body, status code) for the readiness probe"""
+    start_warm_up()
+    ready = model_ready.is_set()
+    body = {
+        "ready": ready,
+        "model": model_registry.default.name,
+        "startup": startup_timings
+    }
+    if warmup_error:
+        body["error"] = f"Model warm-up failed: {warmup_error}"
+    return body, 200 if ready else 503
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    body, status_code = readiness()
+    return jsonify(body), status_code
+
+# ===============================
+# Metrics
+# ===============================
+
+def collect_component_metrics():
+    """Scrape-time gauges for the models, batchers, prediction cache and submission queue"""
+    families = []
+    registry_stats = model_registry.stats()["versions"]
+    batching = {name: stats["batching"] for name, stats in registry_stats.items() if "batching" in stats}
+    if batching:
+        families += [
+            ("waste_api_batch_queue_depth", "gauge", "Images waiting for a forward pass",
+             [({"version": name}, stats["queue_depth"]) for name, stats in batching.items()]),
+            ("waste_api_batches_total", "counter", "Batched forward passes run",
+             [({"version": name}, stats["batches"]) for name, stats in batching.items()]),
+            ("waste_api_batch_size_total", "counter", "Forward passes by batch size",
+             [({"version": name, "size": size}, count)
+              for name, stats in batching.items()
+              for size, count in stats["batch_size_histogram"].items()]),
+        ]
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        families += [
+            ("waste_api_cache_entries", "gauge", "Entries in the in-memory prediction cache",
+             [({}, stats["entries"])]),
+            ("waste_api_cache_lookups_total", "counter", "Prediction cache lookups by result",
+             [({"result": "hit"}, stats["hits"]),
+              ({"result": "shared_hit"}, stats["shared_hits"]),
+              ({"result": "miss"}, stats["misses"])]),
+        ]
+    if submission_queue is not None:
+        stats = submission_queue.stats()
+        families += [
+            ("waste_api_submission_queue_pending", "gauge", "Backend submissions waiting to be sent",
+             [({}, stats["pending"])]),
+            ("waste_api_submission_queue_dead", "gauge", "Backend submissions that failed permanently",
+             [({}, stats["dead"])]),
+            ("waste_api_submission_queue_lag_seconds", "gauge", "Age of the oldest pending submission",
+             [({}, stats["lag_seconds"])]),
+        ]
+    breaker_stats = {name: breaker.stats() for name, breaker in breakers.items()}
+    families += [
+        ("waste_api_circuit_open", "gauge", "1 while the upstream circuit is open or half-open",
+         [({"upstream": name}, int(stats["state"] != "closed")) for name, stats in breaker_stats.items()]),
+        ("waste_api_circuit_rejections_total", "counter", "Calls rejected by an open circuit",
+         [({"upstream": name}, stats["rejected"]) for name, stats in breaker_stats.items()]),
+    ]
+    budget_stats = decode_budget.stats()
+    families += [
+        ("waste_api_decode_memory_bytes", "gauge", "Memory reserved by image decodes in progress",
+         [({}, budget_stats["in_use_bytes"])]),
+        ("waste_api_decode_memory_peak_bytes", "gauge", "Highest decode memory reserved at once",
+         [({}, budget_stats["peak_bytes"])]),
+        ("waste_api_decode_memory_waits_total", "counter", "Decodes that waited for memory budget",
+         [({}, budget_stats["waited"])]),
+        ("waste_api_decode_memory_rejections_total", "counter", "Decodes refused by the memory budget",
+         [({}, budget_stats["rejected"])]),
+    ]
+    queue_stats = admission_queue.stats()
+    families += [
+        ("waste_api_admission_active", "gauge", "Inference requests being handled",
+         [({}, queue_stats["active"])]),
+        ("waste_api_admission_waiting", "gauge", "Inference requests waiting for a slot",
+         [({}, queue_stats["waiting"])]),
+        ("waste_api_rate_limited_clients", "gauge", "Clients with a rate-limit bucket",
+         [({}, rate_limiter.stats()["clients"])]),
+    ]
+    families += [
+        ("waste_api_ready", "gauge", "1 once the model is loaded and warm",
+         [({}, int(model_ready.is_set()))]),
+        ("waste_api_startup_seconds", "gauge", "Time spent in each startup phase",
+         [({"phase": phase.replace("_seconds", "")}, seconds) for phase, seconds in startup_timings.items()]),
+    ]
+    families += [
+        ("waste_api_model_info", "gauge", "Model versions loaded by this process",
+         [({"version": name, "source": stats["source"], "engine": stats.get("engine", "")}, 1)
+          for name, stats in registry_stats.items()]),
+        ("waste_api_model_traffic_share", "gauge", "Share of traffic routed to each model version",
+         [({"version": name}, stats["traffic"]) for name, stats in registry_stats.items()]),
+    ]
+    return families
+
+metrics_registry.add_collector(collect_component_metrics)
+
+@app.before_request
+def start_request_metrics():
+    start_warm_up()
+    g.request_start = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or "unknown"
+    IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    if "request_start" in g:
+        REQUESTS.inc(endpoint=g.metrics_endpoint, status=response.status_code)
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=g.metrics_endpoint)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(_):
+    if "metrics_endpoint" in g:
+        IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(metrics_registry.render(), mimetype=METRICS_CONTENT_TYPE)
+
+# ===============================
+# Admission Control
+# ===============================
+
+rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+# Replaced by an asyncio queue when served by waste_classification_async
+admission_queue = AdmissionQueue(ADMISSION_MAX_ACTIVE, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT)
+
+def admission_stats():
+    return {
+        "queue": admission_queue.stats(),
+        "rate_limit": rate_limiter.stats()
+    }
+
+def client_key(headers, remote_addr):
+    """Rate-limit key: the Authorization header, else the caller's address"""
+    return headers.get("Authorization") or f"addr:{remote_addr}"
+
+def shed_response(endpoint, e):
+    SHED.inc(endpoint=endpoint, reason=e.reason)
     return jsonify({
-        "status": "healthy",
-        "model": "remote (huggingface)",
-        "timestamp": datetime.utcnow().isoformat()
-    })
+        "success": False,
+        "error": str(e)
+    }), e.status_code, {"Retry-After": e.retry_after_header}
+
+@app.before_request
+def admit_request():
+    """Rate-limit and queue inference requests before their upload is read"""
+    if request.endpoint not in ADMITTED_ENDPOINTS or request.method == "OPTIONS":
+        return None
+    try:
+        rate_limiter.check(client_key(request.headers, request.remote_addr))
+        admission_queue.acquire()
+    except Rejected as e:
+        return shed_response(request.endpoint, e)
+    g.admitted = True
+    return None
+
+@app.teardown_request
+def release_admission(_):
+    if g.pop("admitted", False):
+        admission_queue.release()
 
 # ===============================
 # Prediction Route
 # ===============================
 
+def upload_too_large(limit):
+    return jsonify({
+        "success": False,
+        "error": f"Upload too large (max {limit} bytes)"
+    }), 413
+
+def upstream_unavailable(e):
+    response = jsonify({
+        "success": False,
+        "error": str(e)
+    })
+    response.headers["Retry-After"] = str(int(e.retry_after) + 1)
+    return response, 503
+
+def post_to_backend(url, payload, auth_header, timeout):
+    """Synchronous backend POST, summarised for the API response"""
+    try:
+        backend_response = upstream_post(
+            "backend",
+            backend_session,
+            url,
+            json=payload,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": auth_header
+            },
+            timeout=timeout
+        )
+    except CircuitOpenError as e:
+        return {
+            "status": "backend_unavailable",
+            "retry_after": round(e.retry_after, 1)
+        }
+
+    if backend_response.status_code == 200:
+        return backend_response.json()
+    return {
+        "status": "backend_error",
+        "http_status": backend_response.status_code
+    }
+
 @app.route("/predict", methods=["POST"])
 def predict():
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+        return upload_too_large(MAX_UPLOAD_BYTES)
+
+    parse_start = time.perf_counter()
     if "image" not in request.files:
         return jsonify({
             "success": False,
@@ -73,25 +972,41 @@ def predict():
     image_file = request.files["image"]
 
     try:
+        version = choose_model_version(request.headers)
+        top_k = parse_top_k(request.values.get("top_k"))
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "error": e.args[0]
+        }), 400
+
+    try:
+        # The spooled upload is hashed, decoded or forwarded from the file
+        upload = image_file.stream
+        if upload_size(upload) > MAX_UPLOAD_BYTES:
+            return upload_too_large(MAX_UPLOAD_BYTES)
+        STAGE_LATENCY.observe(time.perf_counter() - parse_start, endpoint="predict", stage="parse")
+
         # -------------------------------
-        # Call Hugging Face Inference API
+        # Run inference (local or Hugging Face)
         # -------------------------------
-        hf_response = requests.post(
-            HF_API_URL,
-            headers=HF_HEADERS,
-            files={"file": image_file.read()},
-            timeout=30
-        )
-
-        if hf_response.status_code != 200:
+        try:
+            with STAGE_LATENCY.time(endpoint="predict", stage="inference"):
+                predictions, model_version, inference_source = predict_image(upload, version)
+        except ImageRejected as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), e.status_code
+        except (CircuitOpenError, LocalInferenceTimeout) as e:
+            return upstream_unavailable(e)
+        except InferenceError as e:
             return jsonify({
                 "success": False,
-                "error": "Hugging Face inference failed",
-                "details": hf_response.text
+                "error": str(e),
+                "details": e.details
             }), 500
 
-        predictions = hf_response.json()
-
         if not isinstance(predictions, list) or not predictions:
             return jsonify({
                 "success": False,
@@ -112,8 +1027,8 @@ def predict():
             "confidence": f"{confidence:.4f}",
             "timestamp": datetime.utcnow().isoformat(),
             "image_filename": image_file.filename,
-            "model_version": "Claudineuwa/waste_classifier_Isaac",
-            "inference": "huggingface-api"
+            "model_version": model_version,
+            "inference": inference_source
         }
 
         auth_header = request.headers.get("Authorization")
@@ -123,38 +1038,279 @@ def predict():
                 "error": "Missing Authorization header"
             }), 401
 
-        backend_response = requests.post(
-            BACKEND_URL,
-            json=classification_data,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": auth_header
-            },
-            timeout=10
-        )
+        backend_start = time.perf_counter()
+        if submission_queue is not None:
+            submission_id = submission_queue.enqueue(
+                BACKEND_URL,
+                classification_data,
+                {"Authorization": auth_header}
+            )
+            backend_result = {
+                "status": "queued",
+                "submission_id": submission_id
+            }
+        else:
+            backend_result = post_to_backend(BACKEND_URL, classification_data, auth_header, timeout=10)
+        STAGE_LATENCY.observe(time.perf_counter() - backend_start, endpoint="predict", stage="backend")
 
-        backend_result = (
-            backend_response.json()
-            if backend_response.status_code == 200
-            else {
-                "status": "backend_error",
-                "http_status": backend_response.status_code
+        with STAGE_LATENCY.time(endpoint="predict", stage="serialize"):
+            result = {
+                "success": True,
+                "prediction": label,
+                "confidence": f"{confidence:.4f}",
+                "label_info": label_info(label),
+                "model_version": model_version,
+                "backend_response": backend_result
             }
-        )
+            if top_k > 1:
+                result["top_k"] = rank_predictions(predictions, top_k)
+            response = jsonify(result)
+        return response
 
+    except Exception as e:
         return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+# ===============================
+# Batch Prediction Route
+# ===============================
+
+def spool_member(zf, info):
+    """Extract one archive member into a spooled file instead of a bytes object"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    with zf.open(info) as member:
+        shutil.copyfileobj(member, spooled)
+    spooled.seek(0)
+    return spooled
+
+def read_batch_uploads(images, archive=None):
+    """Collect (filename, file) pairs from the uploaded images and an optional zip.
+
+    `images` are (filename, file) pairs and `archive` a file. They are the
+    spooled upload streams, and archive members are extracted to spooled
+    files, so a large batch is read from disk image by image rather than
+    held in memory.
+    """
+    uploads = list(images)
+    if any(upload_size(upload) > MAX_UPLOAD_BYTES for _, upload in uploads):
+        raise ValueError(f"Image larger than {MAX_UPLOAD_BYTES} bytes")
+
+    if archive is not None:
+        with zipfile.ZipFile(archive) as zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            if sum(info.file_size for info in members) > MAX_ARCHIVE_BYTES:
+                raise ValueError("Archive is too large")
+            if any(info.file_size > MAX_UPLOAD_BYTES for info in members):
+                raise ValueError(f"Image larger than {MAX_UPLOAD_BYTES} bytes")
+            uploads.extend((info.filename, spool_member(zf, info)) for info in members[:MAX_BATCH_IMAGES + 1])
+
+    return uploads
+
+def submit_batch_to_backend(submissions, auth_header, timestamp):
+    """Send a /predict_batch request's classifications to the backend.
+
+    One aggregated submission to BACKEND_BATCH_URL when it is configured,
+    otherwise one submission per image to BACKEND_URL (queued, or posted
+    concurrently), with a list of their results.
+    """
+    headers = {"Authorization": auth_header}
+    if BACKEND_BATCH_URL:
+        batch_data = {
+            "submissions": submissions,
+            "count": len(submissions),
+            "timestamp": timestamp
+        }
+        if submission_queue is not None:
+            return {
+                "status": "queued",
+                "submission_id": submission_queue.enqueue(BACKEND_BATCH_URL, batch_data, headers)
+            }
+        return post_to_backend(BACKEND_BATCH_URL, batch_data, auth_header, timeout=30)
+
+    if submission_queue is not None:
+        return [
+            {"status": "queued", "submission_id": submission_queue.enqueue(BACKEND_URL, submission, headers)}
+            for submission in submissions
+        ]
+
+    def submit(submission):
+        try:
+            return post_to_backend(BACKEND_URL, submission, auth_header, timeout=10)
+        except Exception as e:
+            return {
+                "status": "backend_error",
+                "error": str(e) or e.__class__.__name__
+            }
+    return list(backend_pool.map(submit, submissions))
+
+# Concurrent per-image backend submissions for /predict_batch
+backend_pool = ThreadPoolExecutor(max_workers=8)
+
+def classify_batch(uploads, version, top_k, auth_header):
+    """Classify (filename, file) uploads, submit the results to the backend
+    and return the /predict_batch response body. Shared by both apps."""
+    outcomes = batch_inference([upload for _, upload in uploads], version)
+
+    timestamp = datetime.utcnow().isoformat()
+    results = []
+    submissions = []
+    for (filename, _), (predictions, model_version, inference_source) in zip(uploads, outcomes):
+        if isinstance(predictions, Exception) or not isinstance(predictions, list) or not predictions:
+            results.append({
+                "filename": filename,
+                "success": False,
+                "error": str(predictions) if isinstance(predictions, Exception) else "Invalid inference response"
+            })
+            continue
+
+        top_prediction = max(predictions, key=lambda x: x["score"])
+        label = top_prediction["label"]
+        confidence = float(top_prediction["score"])
+
+        result = {
+            "filename": filename,
             "success": True,
             "prediction": label,
             "confidence": f"{confidence:.4f}",
-            "backend_response": backend_result
+            "label_info": label_info(label),
+            "model_version": model_version
+        }
+        if top_k > 1:
+            result["top_k"] = rank_predictions(predictions, top_k)
+        results.append(result)
+        submissions.append({
+            "prediction": label,
+            "confidence": f"{confidence:.4f}",
+            "timestamp": timestamp,
+            "image_filename": filename,
+            "model_version": model_version,
+            "inference": inference_source
         })
 
+    # -------------------------------
+    # Send to backend
+    # -------------------------------
+    backend_result = None
+    if submissions:
+        backend_result = submit_batch_to_backend(submissions, auth_header, timestamp)
+
+    return {
+        "success": True,
+        "count": len(results),
+        "succeeded": len(submissions),
+        "results": results,
+        "backend_response": backend_result
+    }
+
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    if request.content_length and request.content_length > MAX_BATCH_UPLOAD_BYTES:
+        return upload_too_large(MAX_BATCH_UPLOAD_BYTES)
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return jsonify({
+            "success": False,
+            "error": "Missing Authorization header"
+        }), 401
+
+    try:
+        version = choose_model_version(request.headers)
+        top_k = parse_top_k(request.values.get("top_k"))
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "error": e.args[0]
+        }), 400
+
+    archive = request.files.get("archive")
+    try:
+        uploads = read_batch_uploads(
+            [(image_file.filename, image_file.stream) for image_file in request.files.getlist("images")],
+            archive.stream if archive is not None else None
+        )
+    except (zipfile.BadZipFile, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid upload: {e}"
+        }), 400
+
+    if not uploads:
+        return jsonify({
+            "success": False,
+            "error": "No images uploaded"
+        }), 400
+
+    if len(uploads) > MAX_BATCH_IMAGES:
+        return jsonify({
+            "success": False,
+            "error": f"Too many images (max {MAX_BATCH_IMAGES})"
+        }), 413
+
+    try:
+        return jsonify(classify_batch(uploads, version, top_k, auth_header))
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+# ===============================
+# Model Registry Admin
+# ===============================
+
+def admin_authorized(auth_header):
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(auth_header or "", f"Bearer {ADMIN_TOKEN}")
+
+def update_model_registry(config):
+    """Hot-swap to a new registry configuration.
+
+    New local versions are loaded and warmed in this process before they
+    get traffic. With MODEL_REGISTRY_PATH the file is rewritten too, so
+    the other workers pick the change up from their watchers.
+    """
+    stats = model_registry.apply(config, base_dir=REGISTRY_BASE_DIR, warm=warm_version)
+    if MODEL_REGISTRY_PATH:
+        model_registry.save_file(MODEL_REGISTRY_PATH, config)
+    return stats
+
+@app.route("/admin/models", methods=["GET", "PUT"])
+def admin_models():
+    if not admin_authorized(request.headers.get("Authorization")):
+        return jsonify({
+            "success": False,
+            "error": "Admin access requires ADMIN_TOKEN"
+        }), 403
+
+    if request.method == "GET":
+        return jsonify({
+            "config": model_registry.config,
+            **model_registry.stats()
+        })
+
+    try:
+        stats = update_model_registry(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid registry configuration: {e}"
+        }), 400
+    except Exception as e:
+        logger.exception("Model registry update failed")
+        return jsonify({
+            "success": False,
+            "error": f"Failed to load models, keeping the current ones: {e}"
+        }), 500
+    return jsonify({
+        "success": True,
+        **stats
+    })
+
 # ===============================
 # Error Handlers
 # ===============================
@@ -163,9 +1319,13 @@ def predict():
 def not_found(_):
     return jsonify({
         "error": "Route not found",
-        "available_routes": ["/", "/health", "/predict"]
+        "available_routes": ["/", "/health", "/ready", "/metrics", "/predict", "/predict_batch", "/admin/models"]
     }), 404
 
+@app.errorhandler(413)
+def request_too_large(_):
+    return upload_too_large(app.config["MAX_CONTENT_LENGTH"])
+
 @app.errorhandler(405)
 def method_not_allowed(_):
     return jsonify({
@@ -176,11 +1336,13 @@ def method_not_allowed(_):
 # CORS (Optional)
 # ===============================
 
+# Request headers browsers may send; X-Model-Version picks a registry version
+CORS_ALLOW_HEADERS = "Content-Type,Authorization,X-Model-Version"
 
 @app.after_request
 def after_request(response):
     response.headers.add("Access-Control-Allow-Origin", "*")
-    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
+    response.headers.add("Access-Control-Allow-Headers", CORS_ALLOW_HEADERS)
     response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
     return response
 
@@ -190,4 +1352,5 @@ def after_request(response):
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
+    start_warm_up()
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
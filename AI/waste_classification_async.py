@@ -0,0 +1,560 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+import zipfile
+from datetime import datetime
+from aiohttp import web, ClientError, ClientSession, ClientTimeout, TCPConnector
+from multidict import MultiDict
+
+import waste_classification_api as api
+from admission import AsyncAdmissionQueue, Rejected
+
+logger = logging.getLogger("waste_classification_async")
+
+# ===============================
+# Configuration
+# ===============================
+
+# Connection limit per upstream; keep-alive sockets are reused across requests
+ASYNC_POOL_SIZE = int(os.environ.get("ASYNC_POOL_SIZE", 200))
+
+# aiohttp rejects bodies over 1 MB by default; use the API's upload limit
+ASYNC_MAX_BODY_BYTES = int(os.environ.get("ASYNC_MAX_BODY_BYTES", api.MAX_UPLOAD_BYTES))
+
+# Waiting requests are coroutines rather than threads here, so admission
+# queues on the event loop; the API's limits and metrics apply unchanged
+api.admission_queue = AsyncAdmissionQueue(
+    api.ADMISSION_MAX_ACTIVE, api.ADMISSION_QUEUE_SIZE, api.ADMISSION_QUEUE_TIMEOUT
+)
+
+HF_SESSION = web.AppKey("hf_session", ClientSession)
+BACKEND_SESSION = web.AppKey("backend_session", ClientSession)
+
+# ===============================
+# Upstream Sessions
+# ===============================
+
+async def upstream_sessions(app):
+    app[HF_SESSION] = ClientSession(
+        connector=TCPConnector(limit=ASYNC_POOL_SIZE, keepalive_timeout=60),
+        timeout=ClientTimeout(total=api.HF_TIMEOUT)
+    )
+    app[BACKEND_SESSION] = ClientSession(
+        connector=TCPConnector(limit=ASYNC_POOL_SIZE, keepalive_timeout=60),
+        timeout=ClientTimeout(total=10)
+    )
+    yield
+    await app[HF_SESSION].close()
+    await app[BACKEND_SESSION].close()
+
+# ===============================
+# Inference
+# ===============================
+
+# Remote failures the local fallback model can answer for
+REMOTE_ERRORS = api.REMOTE_ERRORS + (ClientError, asyncio.TimeoutError)
+
+def before_upstream_call(upstream):
+    """Check the upstream's circuit breaker; True if this call is its half-open trial call"""
+    try:
+        return api.breakers[upstream].before_call()
+    except api.CircuitOpenError:
+        api.UPSTREAM_RESPONSES.inc(upstream=upstream, status="circuit_open")
+        raise
+
+def record_upstream_status(upstream, status):
+    breaker = api.breakers[upstream]
+    if api.is_upstream_failure(status):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    api.UPSTREAM_RESPONSES.inc(upstream=upstream, status=status)
+
+async def post_to_hf(session, url, body):
+    # Raw image body, like the Flask app; aiohttp streams a file body in chunks
+    probe = before_upstream_call("huggingface")
+    start = time.perf_counter()
+    try:
+        async with session.post(url, headers=api.HF_HEADERS, data=body) as hf_response:
+            record_upstream_status("huggingface", hf_response.status)
+            if hf_response.status != 200:
+                raise api.InferenceError("Hugging Face inference failed", await hf_response.text())
+            predictions = await hf_response.json(content_type=None)
+        api.hf_latency.observe(time.perf_counter() - start)
+        return predictions
+    except api.InferenceError:
+        raise
+    except asyncio.CancelledError:
+        # A cancelled hedge or client disconnect says nothing about the upstream;
+        # free the trial call if this was it, so the next call can try
+        if probe:
+            api.breakers["huggingface"].release()
+        raise
+    except Exception:
+        api.breakers["huggingface"].record_failure()
+        api.UPSTREAM_RESPONSES.inc(upstream="huggingface", status="error")
+        raise
+    finally:
+        api.UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream="huggingface")
+
+async def remote_predict(session, upload, version):
+    loop = asyncio.get_running_loop()
+    body = await loop.run_in_executor(None, api.prepare_upstream_image, upload)
+    delay = api.hedge_delay() if isinstance(body, bytes) else None
+    if delay is None:
+        return await post_to_hf(session, version.url, body)
+
+    # Race a second request if the first is slower than the hedge delay
+    pending = {asyncio.ensure_future(post_to_hf(session, version.url, body))}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+        api.HEDGES.inc()
+        pending.add(asyncio.ensure_future(post_to_hf(session, version.url, body)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def local_predict(upload, version):
+    loop = asyncio.get_running_loop()
+    image = await loop.run_in_executor(None, api.decode_image, upload)
+    try:
+        # Timing out cancels the batcher's future too, so the image is skipped
+        return await asyncio.wait_for(
+            asyncio.wrap_future(version.batcher.submit(image)),
+            timeout=api.LOCAL_INFERENCE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise api.LocalInferenceTimeout() from None
+
+async def run_inference(app, upload, version):
+    if version.is_local:
+        return await local_predict(upload, version)
+    return await remote_predict(app[HF_SESSION], upload, version)
+
+async def cached_inference(app, upload, version):
+    cache = api.prediction_cache
+    if cache is None:
+        return await run_inference(app, upload, version)
+
+    # Hashing a spooled upload reads it from disk, and the shared tier is
+    # SQLite with a busy timeout, so keep both off the loop
+    loop = asyncio.get_running_loop()
+    key = await loop.run_in_executor(None, cache.key_for, upload, version.cache_namespace)
+    predictions = await loop.run_in_executor(None, cache.get, key)
+    if predictions is None:
+        predictions = await run_inference(app, upload, version)
+        if isinstance(predictions, list) and predictions:
+            await loop.run_in_executor(None, cache.set, key, predictions)
+    return predictions
+
+async def predict_image(app, upload, version):
+    """Async counterpart of api.predict_image"""
+    start = time.perf_counter()
+    try:
+        result = await cached_inference(app, upload, version), version.name, version.source
+    except REMOTE_ERRORS as e:
+        fallback = api.model_registry.fallback_for(version)
+        if fallback is None:
+            raise
+        logger.warning(f"Remote inference failed, using local model: {e!r}")
+        api.FALLBACKS.inc(reason=type(e).__name__)
+        result = await local_predict(upload, fallback), fallback.name, "local-fallback"
+    api.observe_prediction(result[1], time.perf_counter() - start, result[0])
+    return result
+
+# ===============================
+# Backend Submission
+# ===============================
+
+async def post_to_backend(app, payload, auth_header):
+    try:
+        probe = before_upstream_call("backend")
+    except api.CircuitOpenError as e:
+        return {
+            "status": "backend_unavailable",
+            "retry_after": round(e.retry_after, 1)
+        }
+
+    start = time.perf_counter()
+    try:
+        async with app[BACKEND_SESSION].post(
+            api.BACKEND_URL,
+            json=payload,
+            headers={"Authorization": auth_header}
+        ) as backend_response:
+            record_upstream_status("backend", backend_response.status)
+            if backend_response.status == 200:
+                return await backend_response.json(content_type=None)
+            return {
+                "status": "backend_error",
+                "http_status": backend_response.status
+            }
+    except asyncio.CancelledError:
+        if probe:
+            api.breakers["backend"].release()
+        raise
+    except Exception:
+        api.breakers["backend"].record_failure()
+        api.UPSTREAM_RESPONSES.inc(upstream="backend", status="error")
+        raise
+    finally:
+        api.UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream="backend")
+
+# ===============================
+# Routes
+# ===============================
+
+async def home(request):
+    return web.json_response(api.server_status("Waste Classification API is running (async)"))
+
+async def health(request):
+    # Submission queue stats are SQLite queries, so keep them off the loop
+    loop = asyncio.get_running_loop()
+    status = await loop.run_in_executor(None, functools.partial(api.health_status, serving="async"))
+    return web.json_response(status)
+
+async def ready(request):
+    body, status_code = api.readiness()
+    return web.json_response(body, status=status_code)
+
+async def metrics(request):
+    return web.Response(
+        text=api.metrics_registry.render(),
+        headers={"Content-Type": api.METRICS_CONTENT_TYPE}
+    )
+
+async def predict(request):
+    # aiohttp reads and spools the multipart body here
+    parse_start = time.perf_counter()
+    image_file = None
+    if request.content_type.startswith("multipart/"):
+        form = await request.post()
+        image_file = form.get("image")
+
+    if not isinstance(image_file, web.FileField):
+        return web.json_response({
+            "success": False,
+            "error": "No image uploaded"
+        }, status=400)
+
+    try:
+        version = api.choose_model_version(request.headers)
+        top_k = api.parse_top_k(request.query.get("top_k", form.get("top_k")))
+    except (KeyError, ValueError) as e:
+        return web.json_response({
+            "success": False,
+            "error": e.args[0]
+        }, status=400)
+    api.STAGE_LATENCY.observe(time.perf_counter() - parse_start, endpoint="predict", stage="parse")
+
+    try:
+        try:
+            with api.STAGE_LATENCY.time(endpoint="predict", stage="inference"):
+                # aiohttp has already spooled the upload to a temporary file
+                predictions, model_version, inference_source = await predict_image(
+                    request.app, image_file.file, version
+                )
+        except api.ImageRejected as e:
+            return web.json_response({
+                "success": False,
+                "error": str(e)
+            }, status=e.status_code)
+        except (api.CircuitOpenError, api.LocalInferenceTimeout) as e:
+            return web.json_response({
+                "success": False,
+                "error": str(e)
+            }, status=503, headers={"Retry-After": str(int(e.retry_after) + 1)})
+        except api.InferenceError as e:
+            return web.json_response({
+                "success": False,
+                "error": str(e),
+                "details": e.details
+            }, status=500)
+
+        if not isinstance(predictions, list) or not predictions:
+            return web.json_response({
+                "success": False,
+                "error": "Invalid inference response",
+                "raw_response": predictions
+            }, status=500)
+
+        top_prediction = max(predictions, key=lambda x: x["score"])
+
+        label = top_prediction["label"]
+        confidence = float(top_prediction["score"])
+
+        classification_data = {
+            "prediction": label,
+            "confidence": f"{confidence:.4f}",
+            "timestamp": datetime.utcnow().isoformat(),
+            "image_filename": image_file.filename,
+            "model_version": model_version,
+            "inference": inference_source
+        }
+
+        auth_header = request.headers.get("Authorization")
+        if not auth_header:
+            return web.json_response({
+                "success": False,
+                "error": "Missing Authorization header"
+            }, status=401)
+
+        backend_start = time.perf_counter()
+        if api.submission_queue is not None:
+            loop = asyncio.get_running_loop()
+            submission_id = await loop.run_in_executor(
+                None,
+                api.submission_queue.enqueue,
+                api.BACKEND_URL,
+                classification_data,
+                {"Authorization": auth_header}
+            )
+            backend_result = {
+                "status": "queued",
+                "submission_id": submission_id
+            }
+        else:
+            backend_result = await post_to_backend(request.app, classification_data, auth_header)
+        api.STAGE_LATENCY.observe(time.perf_counter() - backend_start, endpoint="predict", stage="backend")
+
+        with api.STAGE_LATENCY.time(endpoint="predict", stage="serialize"):
+            result = {
+                "success": True,
+                "prediction": label,
+                "confidence": f"{confidence:.4f}",
+                "label_info": api.label_info(label),
+                "model_version": model_version,
+                "backend_response": backend_result
+            }
+            if top_k > 1:
+                result["top_k"] = api.rank_predictions(predictions, top_k)
+            response = web.json_response(result)
+        return response
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": str(e) or e.__class__.__name__
+        }, status=500)
+
+async def predict_batch(request):
+    if request.content_length and request.content_length > api.MAX_BATCH_UPLOAD_BYTES:
+        return upload_too_large(api.MAX_BATCH_UPLOAD_BYTES)
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return web.json_response({
+            "success": False,
+            "error": "Missing Authorization header"
+        }, status=401)
+
+    # A batch may be larger than the app-wide body limit, which /predict keeps
+    request = request.clone(client_max_size=api.MAX_BATCH_UPLOAD_BYTES)
+    form = MultiDict()
+    if request.content_type.startswith("multipart/"):
+        try:
+            form = await request.post()
+        except web.HTTPRequestEntityTooLarge:
+            return upload_too_large(api.MAX_BATCH_UPLOAD_BYTES)
+
+    try:
+        version = api.choose_model_version(request.headers)
+        top_k = api.parse_top_k(request.query.get("top_k", form.get("top_k")))
+    except (KeyError, ValueError) as e:
+        return web.json_response({
+            "success": False,
+            "error": e.args[0]
+        }, status=400)
+
+    images = [
+        (field.filename, field.file)
+        for field in form.getall("images", [])
+        if isinstance(field, web.FileField)
+    ]
+    archive = form.get("archive")
+    loop = asyncio.get_running_loop()
+    try:
+        # Archive members are extracted to disk, so keep it off the loop
+        uploads = await loop.run_in_executor(
+            None,
+            api.read_batch_uploads,
+            images,
+            archive.file if isinstance(archive, web.FileField) else None
+        )
+    except (zipfile.BadZipFile, ValueError) as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Invalid upload: {e}"
+        }, status=400)
+
+    if not uploads:
+        return web.json_response({
+            "success": False,
+            "error": "No images uploaded"
+        }, status=400)
+
+    if len(uploads) > api.MAX_BATCH_IMAGES:
+        return web.json_response({
+            "success": False,
+            "error": f"Too many images (max {api.MAX_BATCH_IMAGES})"
+        }, status=413)
+
+    try:
+        # The Flask app's batch path: micro-batched local inference, a
+        # thread pool for Hugging Face and the backend, run off the loop
+        result = await loop.run_in_executor(
+            None, api.classify_batch, uploads, version, top_k, auth_header
+        )
+        return web.json_response(result)
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": str(e) or e.__class__.__name__
+        }, status=500)
+
+def upload_too_large(limit):
+    return web.json_response({
+        "success": False,
+        "error": f"Upload too large (max {limit} bytes)"
+    }, status=413)
+
+# ===============================
+# Middleware (errors, CORS, admission)
+# ===============================
+
+@web.middleware
+async def json_errors_and_cors(request, handler):
+    endpoint = request.match_info.route.name or "unknown"
+    start = time.perf_counter()
+    api.IN_FLIGHT.inc(endpoint=endpoint)
+    try:
+        response = await handler(request)
+    except web.HTTPNotFound:
+        response = web.json_response({
+            "error": "Route not found",
+            "available_routes": ["/", "/health", "/ready", "/metrics", "/predict", "/predict_batch", "/admin/models"]
+        }, status=404)
+    except web.HTTPRequestEntityTooLarge:
+        response = web.json_response({
+            "success": False,
+            "error": f"Upload too large (max {ASYNC_MAX_BODY_BYTES} bytes)"
+        }, status=413)
+    except web.HTTPMethodNotAllowed:
+        if request.method == "OPTIONS":
+            # CORS preflight for an existing route; answered like Flask does
+            response = web.Response(status=200)
+        else:
+            response = web.json_response({
+                "error": "Method not allowed"
+            }, status=405)
+    finally:
+        api.IN_FLIGHT.dec(endpoint=endpoint)
+
+    api.REQUESTS.inc(endpoint=endpoint, status=response.status)
+    api.REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = api.CORS_ALLOW_HEADERS
+    response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
+    return response
+
+@web.middleware
+async def admission_control(request, handler):
+    """Rate-limit and queue inference requests; other routes are the priority lane"""
+    endpoint = request.match_info.route.name
+    if endpoint not in api.ADMITTED_ENDPOINTS or request.method == "OPTIONS":
+        return await handler(request)
+    try:
+        api.rate_limiter.check(api.client_key(request.headers, request.remote))
+        async with api.admission_queue.admit():
+            return await handler(request)
+    except Rejected as e:
+        api.SHED.inc(endpoint=endpoint, reason=e.reason)
+        return web.json_response({
+            "success": False,
+            "error": str(e)
+        }, status=e.status_code, headers={"Retry-After": e.retry_after_header})
+
+# ===============================
+# App Factory
+# ===============================
+
+async def admin_models(request):
+    if not api.admin_authorized(request.headers.get("Authorization")):
+        return web.json_response({
+            "success": False,
+            "error": "Admin access requires ADMIN_TOKEN"
+        }, status=403)
+
+    if request.method == "GET":
+        return web.json_response({
+            "config": api.model_registry.config,
+            **api.model_registry.stats()
+        })
+
+    try:
+        config = await request.json()
+    except ValueError:
+        config = None
+    loop = asyncio.get_running_loop()
+    try:
+        # Loading and warming a checkpoint blocks, so keep it off the loop
+        stats = await loop.run_in_executor(None, api.update_model_registry, config)
+    except ValueError as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Invalid registry configuration: {e}"
+        }, status=400)
+    except Exception as e:
+        logger.exception("Model registry update failed")
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to load models, keeping the current ones: {e}"
+        }, status=500)
+    return web.json_response({
+        "success": True,
+        **stats
+    })
+
+async def start_warm_up(app):
+    api.start_warm_up()
+
+def create_app():
+    app = web.Application(
+        middlewares=[json_errors_and_cors, admission_control],
+        client_max_size=ASYNC_MAX_BODY_BYTES
+    )
+    app.cleanup_ctx.append(upstream_sessions)
+    # on_startup runs in each worker process, after any fork
+    app.on_startup.append(start_warm_up)
+    app.router.add_get("/", home, name="home")
+    app.router.add_get("/health", health, name="health")
+    app.router.add_get("/ready", ready, name="ready")
+    app.router.add_get("/metrics", metrics, name="metrics")
+    app.router.add_post("/predict", predict, name="predict")
+    app.router.add_post("/predict_batch", predict_batch, name="predict_batch")
+    app.router.add_get("/admin/models", admin_models, name="admin_models")
+    app.router.add_put("/admin/models", admin_models)
+    return app
+
+app = create_app()
+
+# ===============================
+# App Runner
+# ===============================
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 10000))
+    web.run_app(app, host="0.0.0.0", port=port)